@@ -0,0 +1,130 @@
+# admission.py
+#
+# Admission control in front of model inference (check_coherence and live
+# pre-scoring), so a launch spike queues briefly or gets a clean "please
+# wait" instead of oversubscribing every core:
+#
+#   ADMISSION_MAX_CONCURRENT   texts in the model at once, running or waiting for
+#                              a batch (default: two batches, 2 x SCORER_BATCH_SIZE;
+#                              CPU count when batching is off)
+#   ADMISSION_MAX_QUEUE        submits allowed to wait for a slot (default 4x that)
+#   ADMISSION_QUEUE_TIMEOUT    seconds a submit waits for a slot (default 2)
+#   ADMISSION_RETRY_BUDGET     rejected model checks per participant and round before a cooldown (default 3)
+#   ADMISSION_COOLDOWN         seconds to wait once the budget is spent (default 20)
+#
+# A slot is held until the inference actually finishes, not just until the
+# page stops waiting for it. The retry budget is keyed "<participant>:<round>"
+# and only charged when the model rejects a justification, so first tries,
+# accepted ones and fallback or error verdicts never count. A key's count is
+# forgotten after COOLDOWN seconds without a rejection. Cached and cheaply
+# rejected texts never get here at all.
+#
+# The controller is per process. With SCORER_MODE=service the scoring daemon
+# runs it, so the cap covers every web process on the machine. In-process,
+# each worker process has its own; with several, set ADMISSION_MAX_CONCURRENT
+# to the cores divided by the number of processes. Separate dynos each have
+# their own CPUs and their own cap.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# The micro-batcher runs one batch at a time across all cores, so the cap is
+# counted in texts: one batch running plus the next one filling up
+_BATCH_SIZE = int(os.environ.get('SCORER_BATCH_SIZE', '16'))
+MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT',
+                                    str(2 * _BATCH_SIZE if _BATCH_SIZE > 1 else os.cpu_count() or 1)))
+MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', str(4 * MAX_CONCURRENT)))
+QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2.0'))
+RETRY_BUDGET = int(os.environ.get('ADMISSION_RETRY_BUDGET', '3'))
+COOLDOWN = float(os.environ.get('ADMISSION_COOLDOWN', '20'))
+# Keys remembered for the retry budget (oldest forgotten first)
+MAX_TRACKED = 10000
+
+
+class Rejected(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"{reason} (retry after {retry_after:.0f}s)")
+        self.reason = reason            # "queue_full", "timeout" or "cooldown"
+        self.retry_after = retry_after  # seconds
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent=MAX_CONCURRENT, max_queue=MAX_QUEUE, queue_timeout=QUEUE_TIMEOUT,
+                 retry_budget=RETRY_BUDGET, cooldown=COOLDOWN):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_budget = retry_budget
+        self.cooldown = cooldown
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._rejections = OrderedDict()  # key -> [count, last rejection]
+        self._counts = {'admitted': 0, 'queue_full': 0, 'timeout': 0, 'cooldown': 0}
+
+    def _check_budget(self, key, now):
+        # Raises if key has spent its retry budget and is still cooling down
+        count, last = self._rejections.get(key, (0, now))
+        if now - last >= self.cooldown:
+            self._rejections.pop(key, None)
+        elif count >= self.retry_budget:
+            self._counts['cooldown'] += 1
+            raise Rejected('cooldown', self.cooldown - (now - last))
+
+    def charge(self, key):
+        # Called when the model rejected key's justification
+        if key is None or self.retry_budget <= 0:
+            return
+        now = time.monotonic()
+        with self._cond:
+            count, last = self._rejections.pop(key, (0, now))
+            if now - last >= self.cooldown:
+                count = 0
+            self._rejections[key] = [count + 1, now]
+            while len(self._rejections) > MAX_TRACKED:
+                self._rejections.popitem(last=False)
+
+    def acquire(self, key=None, timeout=None):
+        # Blocks for a slot (up to timeout); call release() when the work is done.
+        # Refused while key ("<participant>:<round>") is cooling down.
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            if key is not None and self.retry_budget > 0:
+                self._check_budget(key, time.monotonic())
+            if self._active >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    self._counts['queue_full'] += 1
+                    raise Rejected('queue_full', timeout)
+                self._waiting += 1
+                try:
+                    if not self._cond.wait_for(lambda: self._active < self.max_concurrent, timeout):
+                        self._counts['timeout'] += 1
+                        raise Rejected('timeout', timeout)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._counts['admitted'] += 1
+
+    def try_acquire(self):
+        # Non-blocking, no budget: for optional background work
+        with self._cond:
+            if self._active >= self.max_concurrent or self._waiting:
+                return False
+            self._active += 1
+            self._counts['admitted'] += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return dict(self._counts, active=self._active, waiting=self._waiting,
+                        max_concurrent=self.max_concurrent, max_queue=self.max_queue)
+
+
+controller = AdmissionController()
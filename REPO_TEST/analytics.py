@@ -0,0 +1,182 @@
+# analytics.py
+#
+# Study health at a glance, per treatment cell (C.TREATMENTS) and task:
+# accuracy, agreement with the AI prediction, revision rate, responsibility
+# score distribution and bonus totals. Correct answers and predictions come
+# from the stimulus registry, by the stimulus each row was shown.
+#
+#   python -m REPO_TEST.analytics custom_export.csv          # table
+#   python -m REPO_TEST.analytics custom_export.csv --json
+#
+# The input is the app's custom export (models.custom_export); the admin
+# report feeds the same rows straight from the session. Rows are loaded into
+# NumPy arrays once and every statistic is a masked vector operation, so a
+# few tens of thousands of rows take milliseconds.
+
+import argparse
+import csv
+import json
+import sys
+
+import numpy as np
+
+from . import stimuli
+
+INCOME_LABELS = ["High income", "Middle income", "Low income"]
+TASKS = ('income', 'music')
+
+
+def _float(value):
+    if value is None or value == '':
+        return np.nan
+    if isinstance(value, str):
+        if value in ('True', 'False'):
+            return float(value == 'True')
+        if value in INCOME_LABELS:
+            return float(INCOME_LABELS.index(value))
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _encode(value, task):
+    # Income choices become their index in INCOME_LABELS, song scores stay numbers
+    if task == 'income' and isinstance(value, str) and value in INCOME_LABELS:
+        return float(INCOME_LABELS.index(value))
+    return _float(value)
+
+
+def load(rows):
+    # rows: the custom export, header first. Returns {column: ndarray}
+    rows = iter(rows)
+    header = next(rows)
+    col = {name: i for i, name in enumerate(header)}
+    keep = ('participant', 'stimulus', 'round', 'task', 'high_responsibility', 'trust_early', 'choice', 'choice_rev',
+            'choice_changed', 'responsibility_score', 'bonus_acc', 'bonus_resp')
+    columns = {name: [] for name in keep}
+    for row in rows:
+        task = row[col['task']]
+        for name in keep:
+            value = row[col[name]] if name in col else ''
+            if name in ('participant', 'stimulus', 'task'):
+                columns[name].append(value)
+            elif name in ('choice', 'choice_rev'):
+                columns[name].append(_encode(value, task))
+            else:
+                columns[name].append(_float(value))
+    arrays = {name: np.asarray(values, dtype=object if name in ('participant', 'stimulus', 'task') else float)
+              for name, values in columns.items()}
+    arrays['round'] = np.nan_to_num(arrays['round']).astype(int)
+    return arrays
+
+
+def _targets(arrays, attr):
+    # Per-row correct answer or prediction: looked up once per distinct
+    # stimulus id, then broadcast; rows without an id use the default order
+    ids = arrays['stimulus'].copy()
+    for task in stimuli.TASKS.values():
+        for r, item_id in zip(task.rounds, stimuli.default_order(task)):
+            ids[(ids == '') & (arrays['round'] == r)] = item_id
+    unique, inverse = np.unique(ids.astype(str), return_inverse=True)
+    lookup = np.array([_encode(getattr(stimuli.ITEMS[i], attr), stimuli.ITEMS[i].task) if i in stimuli.ITEMS
+                       else np.nan for i in unique])
+    return lookup[inverse] if unique.size else np.zeros(0)
+
+
+def _matches(values, targets, is_music, tolerance):
+    # Income: same category. Music: within the tolerance. NaN never matches.
+    with np.errstate(invalid='ignore'):
+        return np.where(is_music, np.abs(values - targets) <= tolerance, values == targets)
+
+
+def _rate(flags, mask):
+    n = int(mask.sum())
+    return round(float(flags[mask].mean()), 3) if n else None
+
+
+def summarize(arrays, constants):
+    rounds = arrays['round']
+    is_music = arrays['task'] == 'music'
+    answered = ~np.isnan(arrays['choice'])
+    tolerance = getattr(constants, 'MUSIC_TOLERANCE', 10)
+
+    correct = _matches(arrays['choice'], _targets(arrays, 'correct'), is_music, tolerance)
+    predictions = _targets(arrays, 'prediction')
+    agree_before = _matches(arrays['choice'], predictions, is_music, tolerance)
+    agree_after = _matches(arrays['choice_rev'], predictions, is_music, tolerance)
+    changed = np.nan_to_num(arrays['choice_changed']) > 0
+    score = arrays['responsibility_score']
+    bonus_acc = np.nan_to_num(arrays['bonus_acc'])
+    bonus_resp = np.nan_to_num(arrays['bonus_resp'])
+
+    cells = []
+    for high_resp, trust_early in constants.TREATMENTS:
+        in_cell = (arrays['high_responsibility'] == high_resp) & (arrays['trust_early'] == trust_early) & answered
+        for task in TASKS:
+            mask = in_cell & (arrays['task'] == task)
+            scored = mask & (score > 0)
+            scores = score[scored]
+            cells.append({
+                'high_responsibility': bool(high_resp),
+                'trust_early': bool(trust_early),
+                'task': task,
+                'rows': int(mask.sum()),
+                'participants': len(set(arrays['participant'][mask])),
+                'accuracy': _rate(correct, mask),
+                'agree_ai_before': _rate(agree_before, mask),
+                'agree_ai_after': _rate(agree_after, mask),
+                'revision_rate': _rate(changed, mask),
+                'resp_score_n': int(scored.sum()),
+                'resp_score_mean': round(float(scores.mean()), 3) if scores.size else None,
+                'resp_score_p10_p50_p90': [round(float(q), 3) for q in np.percentile(scores, [10, 50, 90])]
+                                          if scores.size else None,
+                'bonus_acc_total': round(float(bonus_acc[mask].sum()), 2),
+                'bonus_resp_total': round(float(bonus_resp[mask].sum()), 2),
+            })
+    return {
+        'rows': int(rounds.size),
+        'answered_rows': int(answered.sum()),
+        'participants': len(set(arrays['participant'][answered])),
+        'cells': cells,
+    }
+
+
+def session_summary(players, constants):
+    from .models import custom_export
+    return summarize(load(custom_export(players)), constants)
+
+
+def print_table(summary):
+    print(f"{summary['participants']} participants, {summary['answered_rows']}/{summary['rows']} answered rows")
+    print(f"{'resp':>4} {'trust':>5} {'task':6} {'n':>6} {'acc':>6} {'ai_pre':>6} {'ai_post':>7} {'rev':>6} "
+          f"{'score':>6} {'bonus_acc':>10} {'bonus_resp':>10}")
+
+    def fmt(value):
+        return '-' if value is None else f"{value:.3f}"
+
+    for cell in summary['cells']:
+        print(f"{int(cell['high_responsibility']):>4} {int(cell['trust_early']):>5} {cell['task']:6} "
+              f"{cell['rows']:>6} {fmt(cell['accuracy']):>6} {fmt(cell['agree_ai_before']):>6} "
+              f"{fmt(cell['agree_ai_after']):>7} {fmt(cell['revision_rate']):>6} "
+              f"{fmt(cell['resp_score_mean']):>6} {cell['bonus_acc_total']:>10.2f} {cell['bonus_resp_total']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-treatment analytics over the REPO_TEST custom export")
+    parser.add_argument('export_csv')
+    parser.add_argument('--json', action='store_true', help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    from .models import C
+    with open(args.export_csv, newline='', encoding='utf-8') as fp:
+        summary = summarize(load(csv.reader(fp)), C)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print_table(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
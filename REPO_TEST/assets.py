@@ -0,0 +1,140 @@
+# assets.py
+#
+# Build step for the explanation images shown on the Task_Revise_* pages:
+#
+#   python -m REPO_TEST.assets check      # every stimulus image exists (exact, case-sensitive name)
+#   python -m REPO_TEST.assets build      # + write resized, recompressed variants (needs Pillow)
+#
+# `build` writes static/REPO_TEST/build/<name>.<hash>.png and .webp, where
+# <hash> is taken from the file's bytes. The names change whenever the
+# content does, so proxies and browsers can cache them indefinitely. It also
+# writes build/manifest.json, which maps each source image to its variants.
+# Commit the build directory. Pages read the manifest through explanation()
+# and fall back to the original PNG for anything that hasn't been built.
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+
+from . import stimuli
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), 'static')
+SOURCE_DIR = os.path.join(STATIC_DIR, 'REPO_TEST')
+BUILD_DIR = os.path.join(SOURCE_DIR, 'build')
+MANIFEST = os.path.join(BUILD_DIR, 'manifest.json')
+# Shown at 65% of a ~1140px container: 1100px covers that at 1.5x density
+MAX_WIDTH = 1100
+
+_manifest = None
+
+
+def referenced():
+    # Explanation image names used by any stimulus, in registry order
+    return list(dict.fromkeys(item.explanation for item in stimuli.ITEMS.values()))
+
+
+def check(names=None):
+    # Returns problems; exact-name match so a case mismatch fails here and
+    # not only on a case-sensitive production filesystem
+    present = set(os.listdir(SOURCE_DIR))
+    problems = []
+    for name in names or referenced():
+        if name not in present:
+            close = [p for p in present if p.lower() == name.lower()]
+            hint = f" (found {close[0]!r}, names are case-sensitive)" if close else ""
+            problems.append(f"missing static/REPO_TEST/{name}{hint}")
+    return problems
+
+
+def _hashed(stem, data, ext):
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}.{ext}"
+
+
+def build(max_width=MAX_WIDTH, colors=256):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise SystemExit("Pillow is needed to build image variants: pip install Pillow")
+
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    manifest = {}
+    for name in referenced():
+        with Image.open(os.path.join(SOURCE_DIR, name)) as im:
+            im = im.convert('RGBA')
+            if im.width > max_width:
+                im = im.resize((max_width, round(im.height * max_width / im.width)), Image.LANCZOS)
+            # Plots and screenshots survive a 256-colour palette with no visible
+            # loss; lossless WebP of the paletted image beats lossy WebP here
+            paletted = im.quantize(colors=colors, method=Image.FASTOCTREE)
+            png, webp = io.BytesIO(), io.BytesIO()
+            paletted.save(png, 'PNG', optimize=True)
+            paletted.convert('RGBA').save(webp, 'WEBP', lossless=True, method=6)
+            width, height = im.size
+
+        stem = os.path.splitext(name)[0]
+        entry = {'width': width, 'height': height}
+        for ext, buf in (('png', png), ('webp', webp)):
+            data = buf.getvalue()
+            filename = _hashed(stem, data, ext)
+            with open(os.path.join(BUILD_DIR, filename), 'wb') as fp:
+                fp.write(data)
+            entry[ext] = f"REPO_TEST/build/{filename}"
+            entry[f"{ext}_bytes"] = len(data)
+        entry['source_bytes'] = os.path.getsize(os.path.join(SOURCE_DIR, name))
+        manifest[name] = entry
+
+    # Drop variants from earlier builds that the new manifest no longer references
+    keep = {os.path.basename(e[ext]) for e in manifest.values() for ext in ('png', 'webp')} | {'manifest.json'}
+    for filename in os.listdir(BUILD_DIR):
+        if filename not in keep:
+            os.remove(os.path.join(BUILD_DIR, filename))
+    with open(MANIFEST, 'w') as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+        fp.write('\n')
+    return manifest
+
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST) as fp:
+                _manifest = json.load(fp)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def explanation(name):
+    # Static paths for an explanation image: the built variants if present,
+    # else the original file
+    entry = load_manifest().get(name)
+    if entry is None:
+        return {'src': f"REPO_TEST/{name}", 'webp': None, 'width': None, 'height': None}
+    return {'src': entry['png'], 'webp': entry['webp'], 'width': entry['width'], 'height': entry['height']}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and build the explanation images")
+    parser.add_argument('command', choices=['check', 'build'])
+    parser.add_argument('--max-width', type=int, default=MAX_WIDTH)
+    args = parser.parse_args(argv)
+
+    problems = check()
+    for problem in problems:
+        print(problem)
+    if problems:
+        return 1
+    print(f"{len(referenced())} explanation images found")
+    if args.command == 'build':
+        for name, entry in build(args.max_width).items():
+            print(f"{name}: {entry['source_bytes']} -> png {entry['png_bytes']}, webp {entry['webp_bytes']} bytes "
+                  f"({entry['width']}x{entry['height']})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,195 @@
+# bench.py
+#
+# Benchmarks for the scorer hot paths over a fixed corpus of short, long,
+# gibberish and copy-pasted justifications:
+#
+#   python -m REPO_TEST.bench --model stand-in -o bench.json     # fast, no torch
+#   python -m REPO_TEST.bench --model real -o bench.json
+#   python -m REPO_TEST.bench --model stand-in --baseline bench.json
+#
+# Reports cold-start time, p50/p95/p99 latency of is_coherent,
+# responsibility_score and Player.apply_responsibility_score per corpus
+# category, is_coherent throughput at several concurrency levels, and peak
+# RSS. Caches are cleared before every timed call unless --warm-cache is
+# given. Results are saved as JSON; --baseline compares against a saved run.
+
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from . import scorer
+
+SEED = 20240601
+PER_CATEGORY = 40
+
+_OPENERS = ["I kept my answer because", "I changed my prediction since", "I agree with the AI as",
+            "I take responsibility for this choice because", "I did not follow the model since"]
+_REASONS = ["the explanation shows education matters most", "the data about wealth supports it",
+            "the song has millions of streams", "the debt is high compared to wealth",
+            "the playlists and listeners point to a lower score", "the working hours suggest a qualified job"]
+_COPY_PASTE = (
+    "Person A: A fully employed single woman with no migration background. She works a standard "
+    "full-time schedule of 40 hours across 5 days per week. She has completed 14.5 years of education. "
+    "Her health is reported as good, and her work satisfaction is very high (9 out of 10)."
+)
+
+
+def build_corpus(per_category=PER_CATEGORY, seed=SEED):
+    rng = random.Random(seed)
+    letters = 'qwertyuiopasdfghjklzxcvbnm'
+    return {
+        'short': [f"{rng.choice(_OPENERS)} {rng.choice(_REASONS)}." for _ in range(per_category)],
+        'long': [" ".join(f"{rng.choice(_OPENERS)} {rng.choice(_REASONS)}." for _ in range(8))
+                 for _ in range(per_category)],
+        'gibberish': [" ".join("".join(rng.choice(letters) for _ in range(rng.randint(3, 9)))
+                               for _ in range(rng.randint(2, 10))) for _ in range(per_category)],
+        'copy_paste': [_COPY_PASTE[:rng.randint(80, len(_COPY_PASTE))] for _ in range(per_category)],
+    }
+
+
+def install_stand_in(ms_per_batch=5.0, ms_per_text=2.0):
+    # Deterministic stand-in for the NLI model with a batch-shaped cost, so
+    # runs without torch still exercise batching, caching and the cascade
+    def stand_in_scores(texts):
+        time.sleep((ms_per_batch + ms_per_text * len(texts)) / 1000)
+        return [0.95 if len(t.split()) > 3 else 0.4 for t in texts]
+
+    scorer.coherence_scores = stand_in_scores
+    scorer.get_classifier = lambda: None
+
+
+def clear_caches():
+    scorer._coherence_cache.clear()
+    scorer._analysis_cache.clear()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {'n': len(ordered), 'p50_ms': round(pick(0.50), 3), 'p95_ms': round(pick(0.95), 3),
+            'p99_ms': round(pick(0.99), 3)}
+
+
+def time_calls(fn, texts, warm_cache):
+    samples = []
+    for text in texts:
+        if not warm_cache:
+            clear_caches()
+        start = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+
+def _apply_responsibility_score():
+    # Player.apply_responsibility_score on a detached stand-in player; needs oTree installed
+    try:
+        from .models import Player
+    except ImportError:
+        return None
+
+    def run(text):
+        player = SimpleNamespace(high_responsibility=True, field_maybe_none=lambda field: text,
+                                 log_event=lambda *args, **kwargs: None)
+        Player.apply_responsibility_score(player)
+
+    return run
+
+
+def throughput(texts, concurrency, warm_cache):
+    if not warm_cache:
+        clear_caches()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(scorer.is_coherent, texts))
+    elapsed = time.perf_counter() - start
+    return round(len(texts) / elapsed, 1)
+
+
+def peak_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_benchmarks(model='stand-in', concurrency=(1, 4, 16, 32), warm_cache=False):
+    corpus = build_corpus()
+    if model == 'stand-in':
+        install_stand_in()
+
+    start = time.perf_counter()
+    scorer.is_coherent(corpus['short'][0])
+    cold_start = time.perf_counter() - start
+
+    hooks = {'is_coherent': scorer.is_coherent, 'responsibility_score': scorer.responsibility_score}
+    apply = _apply_responsibility_score()
+    if apply:
+        hooks['apply_responsibility_score'] = apply
+
+    latency = {name: {category: time_calls(fn, texts, warm_cache) for category, texts in corpus.items()}
+               for name, fn in hooks.items()}
+    all_texts = [t for texts in corpus.values() for t in texts]
+    return {
+        'model': model,
+        'scorer': {k: v for k, v in scorer.local_status().items()
+                   if k in ('backend', 'coherence_mode', 'policy')},
+        'python': platform.python_version(),
+        'warm_cache': warm_cache,
+        'cold_start_s': round(cold_start, 3),
+        'latency': latency,
+        'throughput_per_s': {str(c): throughput(all_texts, c, warm_cache) for c in concurrency},
+        'peak_rss_mb': peak_rss_mb(),
+        'skipped': [] if apply else ['apply_responsibility_score (oTree not installed)'],
+    }
+
+
+def compare(result, baseline, tolerance=0.10):
+    # Returns human-readable regressions beyond the tolerance
+    regressions = []
+    for name, categories in result['latency'].items():
+        for category, row in categories.items():
+            old = baseline.get('latency', {}).get(name, {}).get(category)
+            if old and old['p95_ms'] and row['p95_ms'] > old['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}/{category} p95 {old['p95_ms']} -> {row['p95_ms']} ms")
+    for level, value in result['throughput_per_s'].items():
+        old = baseline.get('throughput_per_s', {}).get(level)
+        if old and value < old * (1 - tolerance):
+            regressions.append(f"throughput@{level} {old} -> {value} /s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scorer hot paths")
+    parser.add_argument('--model', choices=['stand-in', 'real'], default='stand-in')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32])
+    parser.add_argument('--warm-cache', action='store_true', help="don't clear the caches between calls")
+    parser.add_argument('-o', '--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="JSON from an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    result = run_benchmarks(args.model, tuple(args.concurrency), args.warm_cache)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(result, fp, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fp:
+            regressions = compare(result, json.load(fp), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
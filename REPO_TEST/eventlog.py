@@ -0,0 +1,106 @@
+# eventlog.py
+#
+# Structured log of participant actions (choices, revisions, justification
+# verdicts, scores, bonuses). emit() only builds a dict and drops it on a
+# bounded queue; a background thread writes the queue out as JSON lines, so
+# nothing on the request path waits for disk or console I/O. When the queue
+# is full, events are dropped and counted rather than blocking the page.
+#
+#   EVENT_LOG_PATH     JSONL file to append to (default events.jsonl),
+#                      '-' for stdout, empty to switch the log off
+#   EVENT_LOG_LEVEL    debug | info | warning | error (default info)
+#   EVENT_LOG_SAMPLE   fraction of participants whose debug events are kept
+#                      (default 1.0); chosen by participant code, so a
+#                      sampled participant's trace is complete
+#   EVENT_LOG_QUEUE    queue size (default 10000)
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+
+PATH = os.environ.get('EVENT_LOG_PATH', 'events.jsonl')
+LEVEL = LEVELS[os.environ.get('EVENT_LOG_LEVEL', 'info').lower()]
+SAMPLE = float(os.environ.get('EVENT_LOG_SAMPLE', '1.0'))
+QUEUE_SIZE = int(os.environ.get('EVENT_LOG_QUEUE', '10000'))
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_counts = {'emitted': 0, 'written': 0, 'dropped': 0, 'errors': 0}
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def sampled(participant):
+    if SAMPLE >= 1 or participant is None:
+        return True
+    return zlib.crc32(str(participant).encode()) % 10000 < SAMPLE * 10000
+
+
+def emit(event, level='info', participant=None, **fields):
+    if not PATH or LEVELS[level] < LEVEL:
+        return
+    if level == 'debug' and not sampled(participant):
+        return
+    record = {'ts': round(time.time(), 3), 'level': level, 'event': event, 'participant': participant}
+    record.update(fields)
+    try:
+        _queue.put_nowait(record)
+    except queue.Full:
+        _counts['dropped'] += 1
+        return
+    _counts['emitted'] += 1
+    _ensure_writer()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_forever, name='event-log', daemon=True)
+                _writer.start()
+
+
+def _open():
+    if PATH == '-':
+        return sys.stdout
+    return open(PATH, 'a', encoding='utf-8')
+
+
+def _write_forever():
+    out = _open()
+    while True:
+        record = _queue.get()
+        try:
+            # Drain whatever else is queued before paying for a flush
+            while True:
+                out.write(json.dumps(record, default=str) + '\n')
+                _counts['written'] += 1
+                _queue.task_done()
+                record = _queue.get_nowait()
+        except queue.Empty:
+            pass
+        except Exception:
+            _counts['errors'] += 1
+            _queue.task_done()
+        out.flush()
+
+
+def flush(timeout=5.0):
+    # Waits (up to timeout) for queued events to reach the file
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def stats():
+    return dict(_counts, queued=_queue.qsize(), path=PATH or None)
+
+
+atexit.register(flush)
@@ -0,0 +1,135 @@
+# instrumentation.py
+#
+# Low-overhead timing of page hooks and scorer stages. Every Page class in
+# page_sequence gets its is_displayed / vars_for_template / error_message /
+# before_next_page wrapped; each call lands in an in-process latency
+# histogram keyed by (page, hook, round). The scorer adds its own stages
+# under ('scorer', <stage>, None).
+#
+# Read it from the admin report (Subsession.vars_for_admin_report), or set
+# TIMING_LOG_INTERVAL=<seconds> to get one summary log line per key.
+
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+HOOKS = ('is_displayed', 'vars_for_template', 'error_message', 'before_next_page')
+# Bucket upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+LOG_INTERVAL = float(os.environ.get('TIMING_LOG_INTERVAL', '0'))
+
+
+class Histogram:
+    __slots__ = ('counts', 'n', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        # Upper bound of the bucket holding the q-th observation (capped at the max)
+        rank = q * self.n
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(BUCKETS_MS[i], round(self.max, 2)) if i < len(BUCKETS_MS) else round(self.max, 2)
+        return 0.0
+
+    def snapshot(self):
+        return {
+            'n': self.n,
+            'mean_ms': round(self.total / self.n, 2) if self.n else 0.0,
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': round(self.max, 2),
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()
+_reporter = None
+
+
+def observe(key, seconds):
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+            _ensure_reporter()
+        histogram.observe(seconds * 1000)
+
+
+@contextmanager
+def timed(*key):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(key, time.perf_counter() - start)
+
+
+def _wrap(page_name, hook, method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            observe((page_name, hook, self.round_number), time.perf_counter() - start)
+    wrapper._timed = True
+    return wrapper
+
+
+def instrument_pages(page_classes, hooks=HOOKS):
+    for cls in page_classes:
+        for hook in hooks:
+            method = getattr(cls, hook, None)
+            if method is None or getattr(method, '_timed', False):
+                continue
+            setattr(cls, hook, _wrap(cls.__name__, hook, method))
+    return page_classes
+
+
+def snapshot():
+    with _lock:
+        items = [(key, h.snapshot()) for key, h in _histograms.items()]
+    return [dict(page=key[0], hook=key[1], round=key[2], **stats)
+            for key, stats in sorted(items, key=lambda kv: tuple(str(k) for k in kv[0]))]
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def _ensure_reporter():
+    global _reporter
+    if LOG_INTERVAL > 0 and _reporter is None:
+        _reporter = threading.Thread(target=_report_forever, name='timing-reporter', daemon=True)
+        _reporter.start()
+
+
+def _report_forever():
+    while True:
+        time.sleep(LOG_INTERVAL)
+        for row in snapshot():
+            logger.info("timing page=%s hook=%s round=%s n=%d p50=%sms p95=%sms p99=%sms max=%sms",
+                        row['page'], row['hook'], row['round'], row['n'],
+                        row['p50_ms'], row['p95_ms'], row['p99_ms'], row['max_ms'])
@@ -0,0 +1,47 @@
+# ledger.py
+#
+# Per-participant bonus ledger, kept in participant.vars['bonus_ledger']:
+#
+#   {'rounds': {'1': {'task': 'income', 'correct': True, 'acc': 0.5, 'resp': 0.21}, ...},
+#    'acc': 0.5, 'resp': 0.21}
+#
+# Task_Revise_* records each round once it's submitted; recording the same
+# round again replaces its entry and moves the running totals by the
+# difference, so re-submits and page reloads never double-count. Results
+# pages and Debrief only read from here. Amounts are plain floats in points.
+
+KEY = 'bonus_ledger'
+
+
+def _ledger(participant):
+    ledger = participant.vars.get(KEY)
+    if ledger is None:
+        ledger = participant.vars[KEY] = {'rounds': {}, 'acc': 0.0, 'resp': 0.0}
+    return ledger
+
+
+def record(participant, round_number, acc, resp, **info):
+    ledger = _ledger(participant)
+    entry = dict(info, acc=float(acc), resp=float(resp))
+    old = ledger['rounds'].get(str(round_number))
+    if old == entry:
+        return entry
+    if old:
+        ledger['acc'] -= old['acc']
+        ledger['resp'] -= old['resp']
+    ledger['rounds'][str(round_number)] = entry
+    ledger['acc'] += entry['acc']
+    ledger['resp'] += entry['resp']
+    # Reassign so the change is picked up even though only a nested dict moved
+    participant.vars[KEY] = ledger
+    return entry
+
+
+def entry(participant, round_number):
+    return _ledger(participant)['rounds'].get(str(round_number))
+
+
+def totals(participant):
+    # (accuracy, responsibility) across all recorded rounds
+    ledger = _ledger(participant)
+    return round(ledger['acc'], 2), round(ledger['resp'], 2)
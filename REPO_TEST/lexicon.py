@@ -0,0 +1,80 @@
+# lexicon.py
+#
+# Compiled lexicon matcher. All word lists are indexed once, and a single
+# pass over the text's tokens returns every category's matches:
+#   - entries match whole words only ("fact" does not match "manufacture")
+#   - a trailing "*" is a prefix wildcard ("avoid*" matches avoids, avoided, ...)
+#   - multi-word entries ("at fault", "due to") match consecutive words that
+#     are separated by whitespace only
+# Each token costs one dict lookup per distinct wildcard prefix length, so
+# matching time does not grow with the number of entries.
+
+import re
+
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    # (tokens, spans) of an already lower-cased text
+    tokens, spans = [], []
+    for m in TOKEN.finditer(text):
+        tokens.append(m.group())
+        spans.append(m.span())
+    return tokens, spans
+
+
+class LexiconMatcher:
+    def __init__(self, lexicons):
+        # lexicons: {category: iterable of entries}
+        self.lexicons = {category: tuple(entries) for category, entries in lexicons.items()}
+        self._exact = {}      # first word -> [(entry, words)]
+        self._prefix = {}     # first-word prefix -> [(entry, words)]
+        self._categories = {}  # entry -> categories it belongs to
+        for category, entries in self.lexicons.items():
+            for entry in entries:
+                entry = entry.lower()
+                if entry in self._categories:
+                    self._categories[entry].add(category)
+                    continue
+                self._categories[entry] = {category}
+                words = tuple(entry.split())
+                first = words[0]
+                if first.endswith('*'):
+                    self._prefix.setdefault(first[:-1], []).append((entry, words))
+                else:
+                    self._exact.setdefault(first, []).append((entry, words))
+        self._prefix_lengths = sorted({len(p) for p in self._prefix})
+
+    def match(self, text):
+        lower = text.lower()
+        tokens, spans = tokenize(lower)
+        return self.match_tokens(lower, tokens, spans)
+
+    def match_tokens(self, lower, tokens, spans):
+        found = {category: set() for category in self.lexicons}
+        for i, token in enumerate(tokens):
+            candidates = self._exact.get(token, [])
+            for n in self._prefix_lengths:
+                if n > len(token):
+                    break
+                candidates = candidates + self._prefix.get(token[:n], [])
+            for entry, words in candidates:
+                if len(words) == 1 or self._rest_matches(words, lower, tokens, spans, i):
+                    for category in self._categories[entry]:
+                        found[category].add(entry)
+        return found
+
+    @staticmethod
+    def _rest_matches(words, lower, tokens, spans, i):
+        if i + len(words) > len(tokens):
+            return False
+        for k in range(1, len(words)):
+            word, token = words[k], tokens[i + k]
+            if not lower[spans[i + k - 1][1]:spans[i + k][0]].isspace():
+                return False
+            if word.endswith('*'):
+                if not token.startswith(word[:-1]):
+                    return False
+            elif token != word:
+                return False
+        return True
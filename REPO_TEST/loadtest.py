@@ -0,0 +1,103 @@
+# loadtest.py
+#
+# Load-test harness around the bots in tests.py, for sizing dynos before a
+# Prolific launch.
+#
+#   # 1. start the server as in production (prodserver, SCORER_* settings, ...)
+#   # 2. drive N concurrent browser-bot participants through page_sequence
+#   python -m REPO_TEST.loadtest run --participants 50 --server-url http://localhost:8000
+#   # 3. download Data > Page times from the admin and summarise it
+#   python -m REPO_TEST.loadtest report PageTimes-2024-06-01.csv
+#
+# `run` streams the browser-bot output and counts failures. `report` turns
+# the page-times export into per-page latency distributions: the time
+# between a participant completing one page and completing the next, which
+# for bots is dominated by server time.
+
+import argparse
+import csv
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+# Only real failures: a traceback, an exception line ("Error: ...",
+# "KeyError: ...") and the bot runner's FAILED summary. Ordinary log lines
+# that merely mention "error" or "failed" don't count.
+ERROR_LINE = re.compile(r'^(?:Traceback \(most recent call last\)|\w*Error:)|\bFAILED\b')
+
+
+def run_bots(participants, session_config='REPO_TEST_bots', server_url=None, extra_args=()):
+    cmd = ['otree', 'browser_bots', session_config, str(participants)]
+    if server_url:
+        cmd += ['--server-url', server_url]
+    cmd += list(extra_args)
+    errors = []
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout:
+        sys.stdout.write(line)
+        if ERROR_LINE.search(line):
+            errors.append(line.rstrip())
+    return proc.wait(), errors
+
+
+def page_latencies(rows):
+    # {page_name: [seconds, ...]} from page-times export rows
+    by_participant = defaultdict(list)
+    for row in rows:
+        if row.get('is_wait_page') in ('1', 'True'):
+            continue
+        completed = row.get('epoch_time_completed') or row.get('epoch_time')
+        by_participant[row['participant_code']].append(
+            (int(row['page_index']), float(completed), row['page_name'], row.get('round_number')))
+    latencies = defaultdict(list)
+    for pages in by_participant.values():
+        pages.sort()
+        for (_, prev_time, _, _), (_, time_completed, name, _) in zip(pages, pages[1:]):
+            latencies[name].append(time_completed - prev_time)
+    return latencies
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {'n': len(ordered), 'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': ordered[-1]}
+
+
+def report(path):
+    with open(path, newline='', encoding='utf-8') as fp:
+        latencies = page_latencies(csv.DictReader(fp))
+    print(f"{'page':28} {'n':>6} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'max s':>8}")
+    for name, samples in sorted(latencies.items(), key=lambda kv: -summarize(kv[1])['p95']):
+        s = summarize(samples)
+        print(f"{name:28} {s['n']:>6} {s['p50']:>8.3f} {s['p95']:>8.3f} {s['p99']:>8.3f} {s['max']:>8.3f}")
+    return latencies
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bot load test for the REPO_TEST app")
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help="run N concurrent browser bots against a server")
+    run.add_argument('--participants', type=int, default=20)
+    run.add_argument('--session-config', default='REPO_TEST_bots')
+    run.add_argument('--server-url')
+    run.add_argument('extra', nargs=argparse.REMAINDER, help="passed on to `otree browser_bots`")
+    rep = sub.add_parser('report', help="per-page latency from a page-times export")
+    rep.add_argument('page_times_csv')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        code, errors = run_bots(args.participants, args.session_config, args.server_url, args.extra)
+        print(f"\n{args.participants} participants, exit code {code}, {len(errors)} error lines")
+        for line in errors[:20]:
+            print(f"  {line}")
+        return 1 if code or errors else 0
+    report(args.page_times_csv)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
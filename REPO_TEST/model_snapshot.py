@@ -0,0 +1,153 @@
+# model_snapshot.py
+#
+# Pinned local copy of the coherence model, so web and worker processes load
+# it from disk (offline, safetensors, memory-mapped) instead of resolving
+# "facebook/bart-large-mnli" on the hub at startup:
+#
+#   python -m REPO_TEST.model_snapshot download            # pin main's current commit
+#   python -m REPO_TEST.model_snapshot download --revision <commit sha>
+#   python -m REPO_TEST.model_snapshot verify
+#
+# `download` fetches config, tokenizer and safetensors weights (nothing else)
+# into models/<model>/<revision>/ and writes the lock file
+# data/model_snapshot.json. The lock file records the model, the exact commit
+# and a sha256 for every file. Commit the lock file; the next `download`
+# fetches that same revision. Repos that only publish pytorch_model.bin get
+# it converted to safetensors once, here.
+#
+# On Heroku, bin/post_compile runs `download` and `verify` during the build, so
+# the snapshot ships in the slug. Without a committed lock file that build
+# pins main's commit at build time.
+#
+# The scorer loads SCORER_MODEL_PATH, or the locked snapshot if it has been
+# downloaded. With neither it loads from the hub, pinned to the locked
+# revision or SCORER_MODEL_REVISION when there is one, else main.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+MODEL_NAME = "facebook/bart-large-mnli"
+LOCK_PATH = os.path.join(os.path.dirname(__file__), 'data', 'model_snapshot.json')
+MODELS_DIR = os.environ.get('SCORER_MODELS_DIR',
+                            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'models'))
+ALLOW_PATTERNS = ['*.json', '*.txt', '*.model', '*.safetensors']
+
+
+def read_lock(path=LOCK_PATH):
+    try:
+        with open(path) as fp:
+            return json.load(fp)
+    except OSError:
+        return None
+
+
+def snapshot_dir(model, revision):
+    return os.path.join(MODELS_DIR, model.replace('/', '--'), revision)
+
+
+def snapshot_path():
+    # Directory the scorer should load from, or None to fall back to the hub
+    path = os.environ.get('SCORER_MODEL_PATH', '')
+    if path:
+        return path
+    lock = read_lock()
+    if lock:
+        path = snapshot_dir(lock['model'], lock['revision'])
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def model_revision():
+    # Revision for a hub load: the lock file's, else SCORER_MODEL_REVISION, else main
+    lock = read_lock()
+    if lock and lock['model'] == MODEL_NAME:
+        return lock['revision']
+    return os.environ.get('SCORER_MODEL_REVISION', '') or 'main'
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_hashes(path):
+    return {name: _sha256(os.path.join(path, name)) for name in sorted(os.listdir(path))
+            if os.path.isfile(os.path.join(path, name))}
+
+
+def _convert_to_safetensors(path, model, revision):
+    from huggingface_hub import hf_hub_download
+    from transformers import AutoModelForSequenceClassification
+    hf_hub_download(model, 'pytorch_model.bin', revision=revision, local_dir=path)
+    weights = AutoModelForSequenceClassification.from_pretrained(path, local_files_only=True)
+    weights.save_pretrained(path, safe_serialization=True)
+    os.remove(os.path.join(path, 'pytorch_model.bin'))
+
+
+def download(model=MODEL_NAME, revision=None):
+    from huggingface_hub import HfApi, snapshot_download
+
+    lock = read_lock()
+    if revision is None and lock and lock['model'] == model:
+        revision = lock['revision']
+    # Pin to a commit, never a moving branch name
+    revision = HfApi().model_info(model, revision=revision or 'main').sha
+    path = snapshot_dir(model, revision)
+    snapshot_download(model, revision=revision, local_dir=path, allow_patterns=ALLOW_PATTERNS)
+    if not any(name.endswith('.safetensors') for name in os.listdir(path)):
+        _convert_to_safetensors(path, model, revision)
+
+    lock = {'model': model, 'revision': revision, 'files': _file_hashes(path)}
+    with open(LOCK_PATH, 'w') as fp:
+        json.dump(lock, fp, indent=2)
+        fp.write('\n')
+    return path, lock
+
+
+def verify():
+    # Returns problems with the locked snapshot on disk
+    lock = read_lock()
+    if not lock:
+        return [f"no lock file at {LOCK_PATH}; run `download` first"]
+    path = snapshot_dir(lock['model'], lock['revision'])
+    if not os.path.isdir(path):
+        return [f"{path} missing; run `download`"]
+    found = _file_hashes(path)
+    problems = [f"{name}: missing" for name in lock['files'] if name not in found]
+    problems += [f"{name}: sha256 mismatch" for name, digest in lock['files'].items()
+                 if name in found and found[name] != digest]
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download or verify the pinned coherence model snapshot")
+    sub = parser.add_subparsers(dest='command', required=True)
+    dl = sub.add_parser('download', help="fetch the locked (or given) revision and update the lock file")
+    dl.add_argument('--model', default=MODEL_NAME)
+    dl.add_argument('--revision', help="commit sha or branch to pin (default: the locked revision, else main)")
+    sub.add_parser('verify', help="check the snapshot on disk against the lock file")
+    args = parser.parse_args(argv)
+
+    if args.command == 'download':
+        path, lock = download(args.model, args.revision)
+        print(f"{lock['model']}@{lock['revision']} -> {path} ({len(lock['files'])} files)")
+        print(f"Lock file written to {LOCK_PATH}")
+        return 0
+    problems = verify()
+    for problem in problems:
+        print(problem)
+    if not problems:
+        lock = read_lock()
+        print(f"{snapshot_dir(lock['model'], lock['revision'])} matches {LOCK_PATH}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
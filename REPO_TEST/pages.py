@@ -6,7 +6,33 @@ from otree.api import Currency as c
 
 import json
 
-from .scorer import responsibility_score, is_coherent
+from .scorer import responsibility_score, check_coherence
+from .instrumentation import instrument_pages
+from . import admission, assets, ledger, stimuli
+
+
+def justification_error(player, just):
+    if not just:
+        return "Please provide a justification before continuing."
+    try:
+        verdict = check_coherence(just, threshold=C.COHERENCE_THRESHOLD,
+                                  budget_key=f"{player.participant.code}:{player.round_number}")
+    except admission.Rejected as e:
+        # Nothing was judged: the page just asks to resubmit in a moment
+        player.log_event('justification_deferred', 'warning', reason=e.reason,
+                         retry_after=round(e.retry_after, 1), chars=len(just))
+        if e.reason == 'cooldown':
+            return (f"Please take a moment to revise your justification, then try again in "
+                    f"{max(1, round(e.retry_after))} seconds.")
+        return "Many participants are submitting right now. Please wait a few seconds and click Next again."
+    player.coherence_passed = verdict.coherent
+    player.coherence_decided_by = verdict.decided_by
+    player.log_event('justification_verdict', coherent=verdict.coherent, decided_by=verdict.decided_by,
+                     reason=verdict.reason, seconds=round(verdict.seconds, 3), chars=len(just))
+    if not verdict.coherent:
+        return "Your justification doesn't seem meaningful. Please revise and provide a clearer answer."
+
+
 class ProlificID(Page):
     form_model = 'player'
     form_fields = ['prolific_id']
@@ -59,6 +85,8 @@ class ConsentAndComprehension(Page):
                 self.player.comp_model_accuracy == '86% & 72%' and
                 self.player.comp_payment == '£2.00 + bonus'
         )
+        # Later rounds have their own Player rows, so keep the outcome on the participant
+        self.participant.vars['comprehension_failed'] = self.player.comprehension_failed
 
 
 class ComprehensionFail(Page):
@@ -73,27 +101,27 @@ class NoConsent(Page):
 
 class RequiresComprehensionPass(Page):
     def is_displayed(self):
-        return not self.player.comprehension_failed
+        return not self.participant.vars.get('comprehension_failed', False)
 
 
 class ResponsibilityIntroIncome(RequiresComprehensionPass):
     def is_displayed(self):
-        return self.round_number == 1 and self.player.high_responsibility
+        return self.round_number == 1 and self.player.high_responsibility and super().is_displayed()
 
 
 class ControlIntroIncome(RequiresComprehensionPass):
     def is_displayed(self):
-        return self.round_number == 1 and not self.player.high_responsibility
+        return self.round_number == 1 and not self.player.high_responsibility and super().is_displayed()
 
 
 class ResponsibilityIntroSongs(RequiresComprehensionPass):
     def is_displayed(self):
-        return self.round_number == 4 and self.player.high_responsibility
+        return self.round_number == 4 and self.player.high_responsibility and super().is_displayed()
 
 
 class ControlIntroSongs(RequiresComprehensionPass):
     def is_displayed(self):
-        return self.round_number == 4 and not self.player.high_responsibility
+        return self.round_number == 4 and not self.player.high_responsibility and super().is_displayed()
 
 
 class AITrustSurvey(RequiresComprehensionPass):
@@ -111,106 +139,92 @@ class Task_Info_Income(RequiresComprehensionPass):
         return self.round_number in C.INCOME_ROUNDS and super().is_displayed()
 
     def get_form_fields(self):
-        return [f'income_choice_{self.round_number}']
+        return ['income_choice']
 
     def vars_for_template(self):
+        stimulus = self.player.stimulus()
+        image = assets.explanation(stimulus.explanation)
         return {
-            'person_desc': self.player.person_desc(),
-            'question': "Into which income group would you classify this person?",
-            'description': self.player.person_desc()
+            'person_desc': stimulus.description,
+            'question': stimuli.TASKS['income'].question,
+            'description': stimulus.description,
+            'preload_image': image['webp'] or image['src'],
+            'preload_type': 'image/webp' if image['webp'] else None,
         }
 
     def before_next_page(self):
-        value = getattr(self.player, f'income_choice_{self.round_number}', None)
-    # print(f"[DEBUG] Round {self.round_number}: income_choice_{self.round_number} = {value}")
+        self.player.log_event('choice', task='income', choice=self.player.field_maybe_none('income_choice'))
 
 
 class Task_Revise_Income(RequiresComprehensionPass):
     form_model = 'player'
+    live_method = 'live_justification'
 
     def is_displayed(self):
         return self.round_number in C.INCOME_ROUNDS and super().is_displayed()
 
     def get_form_fields(self):
-        fields = [f'income_choice_rev_{self.round_number}']
+        fields = ['income_choice_rev']
         if self.player.high_responsibility:
-            fields.append(f'justification_{self.round_number}')
+            fields.append('justification')
         return fields
 
     def vars_for_template(self):
-        idx = self.round_number - C.INCOME_ROUNDS[0]
+        stimulus = self.player.stimulus()
+        image = assets.explanation(stimulus.explanation)
         return {
-            "AI_Prediction": C.INCOME_PREDICTIONS[idx],
-            "eXplanation": f"REPO_TEST/{C.INCOME_EXPLANATIONS[idx]}",
-            "income_description": self.player.person_desc(),
+            "AI_Prediction": stimulus.prediction,
+            "eXplanation": image['src'],
+            "explanation_webp": image['webp'],
+            "explanation_width": image['width'],
+            "explanation_height": image['height'],
+            "income_description": stimulus.description,
             "high_responsibility": self.player.high_responsibility,
-            "income_choice_rev_field": f"income_choice_rev_{self.round_number}",
-            "justification_field": f'justification_{self.round_number}' if self.player.high_responsibility else None
+            "income_choice_rev_field": "income_choice_rev",
+            "justification_field": 'justification' if self.player.high_responsibility else None
         }
 
     def error_message(self, values):
-        rev = values.get(f'income_choice_rev_{self.round_number}')
+        rev = values.get('income_choice_rev')
         if not rev:
             return "Please make a selection before continuing."
         if self.player.high_responsibility:
-            just = values.get(f'justification_{self.round_number}', '').strip()
-            if not just:
-                return "Please provide a justification before continuing."
-            if not is_coherent(just, threshold=0.9):
-                return "Your justification doesn't seem meaningful. Please revise and provide a clearer answer."
+            just = (values.get('justification') or '').strip()
+            return justification_error(self.player, just)
 
     def before_next_page(self):
-        round1_player = self.participant.get_players()[0]
+        player = self.player
         round_num = self.round_number
-        orig = getattr(self.player, f"income_choice_{round_num}", None)
-        rev = getattr(self.player, f"income_choice_rev_{round_num}", None) or orig
-        justification = self.player.field_maybe_none(f"justification_{self.round_number}") or ""
-
-        setattr(round1_player, f"income_choice_{round_num}", orig)
-        setattr(round1_player, f"income_choice_rev_{round_num}", rev)
-        setattr(round1_player, f"justification_{round_num}", justification or "")
-
-        if rev != orig:
-            setattr(round1_player, f"income_changed_{round_num}", True)
-
-        if round1_player.high_responsibility and justification and justification.strip():
-            round1_player.apply_responsibility_score(round_num)
-        round1_player.calculate_round_bonus(round_num)
-
-        # Optional debug
-        # print(f"--- DEBUG ROUND {round_num} ---")
-        # print(f"Original Income Choice: {orig}")
-        # print(f"Revised Income Choice: {rev}")
-        # print(f"Justification: '{justification}'")
-        # print(f"Responsibility score: {getattr(round1_player, f'responsibility_score_{round_num}', 'N/A')}")
-        # print(f"Bonus Accuracy: {getattr(round1_player, f'bonus_acc_{round_num}', 'N/A')}")
-        # print(f"Bonus Responsibility: {getattr(round1_player, f'bonus_resp_{round_num}', 'N/A')}")
-        # print(f"High responsibility: {round1_player.high_responsibility}")
-
-class Task_Results_Income(Page):
+        orig = player.field_maybe_none('income_choice')
+        rev = player.field_maybe_none('income_choice_rev') or orig
+        justification = player.field_maybe_none('justification') or ""
+
+        player.income_choice_rev = rev
+        player.justification = justification
+        player.choice_changed = rev != orig
+        player.log_event('revision', task='income', choice=orig, revised=rev, changed=player.choice_changed)
+
+        if player.high_responsibility and justification.strip():
+            player.apply_responsibility_score()
+        player.calculate_round_bonus()
+
+class Task_Results_Income(RequiresComprehensionPass):
     def is_displayed(self):
         # Show after each income round
-        return self.round_number in C.INCOME_ROUNDS
+        return self.round_number in C.INCOME_ROUNDS and super().is_displayed()
 
     def vars_for_template(self):
         round_num = self.round_number
-        round1_player = self.participant.get_players()[0]
+        player = self.player
 
         # Original and revised choices
-        original_choice = getattr(round1_player, f"income_choice_{round_num}", None)
-        revised_choice = getattr(round1_player, f"income_choice_rev_{round_num}", None) or original_choice
-
-        # Compute accuracy bonus
-        correct_income = getattr(C, "CORRECT_INCOME_ANSWERS")[round_num - C.INCOME_ROUNDS[0]]
-        accuracy_bonus = 0.50 if original_choice == correct_income else 0
+        original_choice = player.field_maybe_none('income_choice')
+        revised_choice = player.field_maybe_none('income_choice_rev') or original_choice
 
-        # Responsibility bonus
-        responsibility_bonus = 0
-        if round1_player.high_responsibility:
-            responsibility_score = getattr(round1_player, f"responsibility_score_{round_num}", 0)
-            responsibility_bonus = responsibility_score * 0.50
-
-        # Total bonus
+        # Bonuses as recorded when the revision was submitted
+        entry = ledger.entry(self.participant, round_num) or player.calculate_round_bonus()
+        accuracy_bonus = entry['acc']
+        responsibility_bonus = entry['resp']
         total_bonus = accuracy_bonus + responsibility_bonus
 
         return {
@@ -244,45 +258,53 @@ class Task_Info_Songs(RequiresComprehensionPass):
         return self.round_number in C.SONGS_ROUNDS and super().is_displayed()
 
     def get_form_fields(self):
-        return [f'music_choice_{self.round_number}']
+        return ['music_choice']
 
     def vars_for_template(self):
+        stimulus = self.player.stimulus()
+        image = assets.explanation(stimulus.explanation)
         return {
-            'song_desc': self.player.song_desc(),
-            'question': "What score would you give this song?",
-            'description': self.player.song_desc()
+            'song_desc': stimulus.description,
+            'question': stimuli.TASKS['music'].question,
+            'description': stimulus.description,
+            'preload_image': image['webp'] or image['src'],
+            'preload_type': 'image/webp' if image['webp'] else None,
         }
 
     def before_next_page(self):
-        value = getattr(self.player, f'music_choice_{self.round_number}', None)
-        # print(f"[DEBUG] Round {self.round_number}: music_choice_{self.round_number} = {value}")
+        self.player.log_event('choice', task='music', choice=self.player.field_maybe_none('music_choice'))
 
 
 class Task_Revise_Songs(RequiresComprehensionPass):
     form_model = 'player'
+    live_method = 'live_justification'
 
     def is_displayed(self):
         return self.round_number in C.SONGS_ROUNDS and super().is_displayed()
 
     def get_form_fields(self):
-        fields = [f'music_choice_rev_{self.round_number}']
+        fields = ['music_choice_rev']
         if self.player.high_responsibility:
-            fields.append(f'justification_{self.round_number}')
+            fields.append('justification')
         return fields
 
     def vars_for_template(self):
-        idx = self.round_number - C.SONGS_ROUNDS[0]
+        stimulus = self.player.stimulus()
+        image = assets.explanation(stimulus.explanation)
         return {
-            "AI_Prediction": C.SONGS_PREDICTIONS[idx],
-            "eXplanation": f"REPO_TEST/{C.SONGS_EXPLANATIONS[idx].lower()}",
-            "song_description": self.player.song_desc(),
+            "AI_Prediction": stimulus.prediction,
+            "eXplanation": image['src'],
+            "explanation_webp": image['webp'],
+            "explanation_width": image['width'],
+            "explanation_height": image['height'],
+            "song_description": stimulus.description,
             "high_responsibility": self.player.high_responsibility,
-            "music_choice_rev_field": f"music_choice_rev_{self.round_number}",
-            "justification_field": f'justification_{self.round_number}' if self.player.high_responsibility else None
+            "music_choice_rev_field": "music_choice_rev",
+            "justification_field": 'justification' if self.player.high_responsibility else None
         }
 
     def error_message(self, values):
-        rev = values.get(f'music_choice_rev_{self.round_number}')
+        rev = values.get('music_choice_rev')
         if rev is None:
             return "You must provide a revised prediction."
         try:
@@ -292,66 +314,42 @@ class Task_Revise_Songs(RequiresComprehensionPass):
         if not (1 <= val <= 100):
             return "The score must be between 1 and 100."
         if self.player.high_responsibility:
-            just = values.get(f'justification_{self.round_number}', '').strip()
-            if not just:
-                return "Please provide a justification before continuing."
-            if not is_coherent(just, threshold=0.9):
-                return "Your justification doesn't seem meaningful. Please revise and provide a clearer answer."
-
-    def before_next_page(self):  # if self.round_number in [4, 5, 6]:
-        # self.calculate_round_bonus(self.round_number)
-        round1_player = self.participant.get_players()[0]
-        orig = getattr(self.player, f"music_choice_{self.round_number}")
-        rev = getattr(self.player, f"music_choice_rev_{self.round_number}") or orig
-        justification = self.player.field_maybe_none(f"justification_{self.round_number}") or ""
-
-        setattr(round1_player, f"music_choice_{self.round_number}", orig)
-        setattr(round1_player, f"music_choice_rev_{self.round_number}", rev)
-        setattr(round1_player, f"justification_{self.round_number}", justification)
-
-        if rev != orig:
-            setattr(round1_player, f"music_changed_{self.round_number}", True)
-        if round1_player.high_responsibility and justification.strip():
-            round1_player.apply_responsibility_score(self.round_number)
-
-        # Calculate and store bonuses on round1_player
-        round1_player.calculate_round_bonus(self.round_number)
-
-        # DEBUG print to see what's going on
-        # print(f"--- DEBUG ROUND {self.round_number} ---")
-        # print(f"Original: {orig}")
-        # print(f"Revised: {rev}")
-        # print(f"Justification: '{justification}'")
-        # print(f"Responsibility score: {getattr(round1_player, f'responsibility_score_{self.round_number}', 'N/A')}")
-        # print(f"Bonus Accuracy: {getattr(round1_player, f'bonus_acc_{self.round_number}', 'N/A')}")
-        # print(f"Bonus Responsibility: {getattr(round1_player, f'bonus_resp_{self.round_number}', 'N/A')}")
-        # print(f"High responsibility: {round1_player.high_responsibility}")
-
-class Task_Results_Music(Page):
+            just = (values.get('justification') or '').strip()
+            return justification_error(self.player, just)
+
+    def before_next_page(self):
+        player = self.player
+        orig = player.field_maybe_none('music_choice')
+        rev = player.field_maybe_none('music_choice_rev') or orig
+        justification = player.field_maybe_none('justification') or ""
+
+        player.music_choice_rev = rev
+        player.justification = justification
+        player.choice_changed = rev != orig
+        player.log_event('revision', task='music', choice=orig, revised=rev, changed=player.choice_changed)
+        if player.high_responsibility and justification.strip():
+            player.apply_responsibility_score()
+
+        # Calculate and store bonuses on this round's player
+        player.calculate_round_bonus()
+
+class Task_Results_Music(RequiresComprehensionPass):
     def is_displayed(self):
         # Display only for music rounds after revision
-        return self.round_number in C.SONGS_ROUNDS
+        return self.round_number in C.SONGS_ROUNDS and super().is_displayed()
 
     def vars_for_template(self):
         round_num = self.round_number
-        round1_player = self.participant.get_players()[0]
+        player = self.player
 
         # Original and revised choices
-        original_choice = getattr(round1_player, f"music_choice_{round_num}")
-        revised_choice = getattr(round1_player, f"music_choice_rev_{round_num}")
+        original_choice = player.field_maybe_none('music_choice')
+        revised_choice = player.field_maybe_none('music_choice_rev')
 
-        # Compute accuracy bonus based on tolerance
-        correct_score = getattr(C, "CORRECT_MUSIC_SCORES")[round_num - C.SONGS_ROUNDS[0]]
-        tolerance = 11
-        accuracy_bonus = 0.50 if abs(float(original_choice) - float(correct_score)) <= tolerance else 0
-
-        # Responsibility bonus if applicable
-        responsibility_bonus = 0
-        if round1_player.high_responsibility:
-            responsibility_score = getattr(round1_player, f"responsibility_score_{round_num}", 0)
-            responsibility_bonus = responsibility_score * 0.50
-
-        # Total bonus
+        # Bonuses as recorded when the revision was submitted
+        entry = ledger.entry(self.participant, round_num) or player.calculate_round_bonus()
+        accuracy_bonus = entry['acc']
+        responsibility_bonus = entry['resp']
         total_bonus = accuracy_bonus + responsibility_bonus
 
         return {
@@ -389,12 +387,14 @@ class Debrief(RequiresComprehensionPass):
     def is_displayed(self):
         return self.round_number == C.NUM_ROUNDS and super().is_displayed()
 
-    def before_next_page(self):
+    def vars_for_template(self):
+        # Debrief has no Next button, so payment is settled when it renders;
+        # settling is idempotent, so reloads are harmless
         participation_fee = self.session.config.get('participation_fee', c(2))
         round1_player = self.participant.get_players()[0]
 
-        # Calculate bonuses for totals
-        round1_player.calculate_bonuses()
+        # Copy the ledger totals onto the round-1 row for the export
+        round1_player.settle_bonuses()
 
         # Final payment = participation fee + total bonuses
         round1_player.final_payment = round1_player.total_bonus_payment + participation_fee
@@ -403,20 +403,12 @@ class Debrief(RequiresComprehensionPass):
         self.participant.payoff = round1_player.final_payment
         self.participant.vars['final_payment'] = float(round1_player.final_payment)
 
-    def vars_for_template(self):
-        round1_player = self.participant.get_players()[0]
-        round1_player.calculate_bonuses()
-
-        participation_fee = self.session.config['participation_fee']
-        final_payment = round1_player.total_bonus_payment + participation_fee
-
         return {
             'participation_fee': participation_fee,
             'bonus_accuracy': round1_player.total_bonus_accuracy.to_real_world_currency(self.session),
             'bonus_responsibility': round1_player.total_bonus_responsibility.to_real_world_currency(self.session),
             'bonus_payment': round1_player.total_bonus_payment.to_real_world_currency(self.session),
-            'final_payment': (round1_player.total_bonus_payment + participation_fee).to_real_world_currency(self.session),
-            #'final_payment': final_payment.to_real_world_currency(self.session),
+            'final_payment': round1_player.final_payment.to_real_world_currency(self.session),
             'high_responsibility': round1_player.high_responsibility,
             'player': round1_player
         }
@@ -445,4 +437,4 @@ page_sequence = [
     Debrief,
 ]
 
-
+instrument_pages(page_sequence)
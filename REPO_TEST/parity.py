@@ -0,0 +1,125 @@
+# parity.py
+#
+# Compares the reduced-precision inference backends of the coherence model
+# against fp32 on a labelled set of justifications:
+#
+#   python -m REPO_TEST.parity                      # int8 and bf16 vs fp32
+#   python -m REPO_TEST.parity --backends int8 --json parity.json
+#   python -m REPO_TEST.parity --mode entailment     # single-hypothesis mode
+#
+# For each backend it reports load time, per-text latency, how far the
+# coherence scores drift from fp32, how many threshold decisions flip, and
+# accuracy against the labels. In entailment mode it also sweeps thresholds
+# against the fp32 zero-shot decisions at 0.9, which is how
+# SCORER_ENTAILMENT_THRESHOLD should be calibrated.
+
+import argparse
+import json
+import os
+import time
+
+from . import scorer
+
+DEFAULT_DATA = os.path.join(os.path.dirname(__file__), 'data', 'parity_justifications.jsonl')
+
+
+def load_labelled(path=DEFAULT_DATA):
+    with open(path, encoding='utf-8') as fp:
+        rows = [json.loads(line) for line in fp if line.strip()]
+    return [r['text'] for r in rows], [bool(r['coherent']) for r in rows]
+
+
+def run_backend(backend, texts, mode='zero_shot', batch_size=8, clf=None, load_seconds=None):
+    # Pass clf to reuse an already built classifier, with the time its build took
+    if clf is None:
+        start = time.perf_counter()
+        clf = scorer.build_classifier(backend)
+        load_seconds = time.perf_counter() - start
+    scores = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        scores.extend(scorer.coherence_scores(texts[i:i + batch_size], classifier=clf, mode=mode))
+    infer_seconds = time.perf_counter() - start
+    return scores, {
+        'load_seconds': None if load_seconds is None else round(load_seconds, 2),
+        'ms_per_text': round(1000 * infer_seconds / len(texts), 1),
+    }
+
+
+def compare(reference, scores, labels, threshold):
+    diffs = [abs(a - b) for a, b in zip(reference, scores)]
+    decisions = [s >= threshold for s in scores]
+    ref_decisions = [s >= threshold for s in reference]
+    return {
+        'max_abs_diff': round(max(diffs), 4),
+        'mean_abs_diff': round(sum(diffs) / len(diffs), 4),
+        'decision_agreement': round(sum(a == b for a, b in zip(decisions, ref_decisions)) / len(scores), 4),
+        'flipped': [i for i, (a, b) in enumerate(zip(decisions, ref_decisions)) if a != b],
+        'accuracy': round(sum(d == l for d, l in zip(decisions, labels)) / len(labels), 4),
+    }
+
+
+def calibrate(scores, target_decisions, labels):
+    # Threshold that best reproduces the zero-shot decisions (ties: best label accuracy)
+    best = None
+    for step in range(5, 100, 5):
+        t = step / 100
+        decisions = [s >= t for s in scores]
+        agreement = sum(d == r for d, r in zip(decisions, target_decisions)) / len(scores)
+        accuracy = sum(d == l for d, l in zip(decisions, labels)) / len(labels)
+        if best is None or (agreement, accuracy) > (best['agreement'], best['accuracy']):
+            best = {'threshold': t, 'agreement': round(agreement, 4), 'accuracy': round(accuracy, 4)}
+    return best
+
+
+def parity_report(backends, data=DEFAULT_DATA, threshold=0.9, mode='zero_shot'):
+    texts, labels = load_labelled(data)
+    # fp32 is built here because the entailment calibration reuses it
+    start = time.perf_counter()
+    fp32 = scorer.build_classifier('fp32')
+    reference, timing = run_backend('fp32', texts, mode, clf=fp32, load_seconds=time.perf_counter() - start)
+    report = {'mode': mode, 'threshold': threshold, 'n': len(texts),
+              'fp32': dict(timing, **compare(reference, reference, labels, threshold))}
+    if mode == 'entailment':
+        zero_shot, _ = run_backend('fp32', texts, 'zero_shot', clf=fp32)
+        report['calibration'] = calibrate(reference, [s >= 0.9 for s in zero_shot], labels)
+    for backend in backends:
+        scores, timing = run_backend(backend, texts, mode)
+        report[backend] = dict(timing, **compare(reference, scores, labels, threshold))
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare coherence model backends against fp32")
+    parser.add_argument('--backends', nargs='+', default=['int8', 'bf16'], choices=scorer.BACKENDS)
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--mode', default='zero_shot', choices=scorer.COHERENCE_MODES)
+    parser.add_argument('--threshold', type=float,
+                        help="decision threshold (default 0.9, or SCORER_ENTAILMENT_THRESHOLD in entailment mode)")
+    parser.add_argument('--json', help="also write the report to this file")
+    args = parser.parse_args(argv)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = scorer.ENTAILMENT_THRESHOLD if args.mode == 'entailment' else 0.9
+
+    report = parity_report([b for b in args.backends if b != 'fp32'], args.data, threshold, args.mode)
+    print(f"{report['n']} justifications, {report['mode']} mode, threshold {report['threshold']}")
+    print(f"{'backend':8} {'load s':>7} {'ms/text':>8} {'max diff':>9} {'mean diff':>10} {'agree':>6} {'accuracy':>9}")
+    for backend, row in report.items():
+        if not isinstance(row, dict):
+            continue
+        if backend == 'calibration':
+            continue
+        print(f"{backend:8} {row['load_seconds']:>7} {row['ms_per_text']:>8} {row['max_abs_diff']:>9} "
+              f"{row['mean_abs_diff']:>10} {row['decision_agreement']:>6} {row['accuracy']:>9}")
+    if 'calibration' in report:
+        cal = report['calibration']
+        print(f"Suggested SCORER_ENTAILMENT_THRESHOLD={cal['threshold']} "
+              f"(agrees with zero-shot@0.9 on {cal['agreement']:.0%}, label accuracy {cal['accuracy']:.0%})")
+    if args.json:
+        with open(args.json, 'w') as fp:
+            json.dump(report, fp, indent=2)
+
+
+if __name__ == '__main__':
+    main()
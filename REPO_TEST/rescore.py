@@ -0,0 +1,188 @@
+# rescore.py
+#
+# Offline re-scoring of exported justifications, e.g. after the lexicons or
+# the coherence threshold change:
+#
+#   python -m REPO_TEST.rescore export.csv -o rescored.jsonl --workers 2
+#   python -m REPO_TEST.rescore --text "I kept my answer because the data supports it."
+#
+# The input is an oTree CSV export (<app>.<round>.player.justification
+# columns, or the older justification_<round> ones), the app's custom export
+# (justification + round columns) or JSONL with the same keys. Rows are
+# streamed in, scored in batches on a process pool (one model load per
+# worker) and every result is appended to the output as soon as it is ready.
+# Re-running the same command resumes: justifications already in the output
+# file are skipped.
+#
+# Each worker holds its own copy of the model, about 1.6 GB of RAM in fp32,
+# so --workers defaults to min(CPU count, 2). The cores are split between the
+# workers (torch threads = cores // workers) rather than every worker starting
+# one torch thread per core. Raise --workers only if memory allows.
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from . import scorer
+
+JUSTIFICATION_COLUMN = re.compile(r'(?:^|\.)(?:(\d+)\.player\.justification|justification_(\d+)|justification)$')
+PARTICIPANT_COLUMNS = ('participant.code', 'participant_code', 'participant', 'code')
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as fp:
+        if path.endswith('.jsonl'):
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(fp)
+
+
+def iter_items(rows):
+    # One item per (participant, round) justification, first occurrence wins
+    seen = set()
+    for index, row in enumerate(rows):
+        participant = next((row[c] for c in PARTICIPANT_COLUMNS if row.get(c)), f"row{index}")
+        for column, text in row.items():
+            m = JUSTIFICATION_COLUMN.search(column or '')
+            if not m or not text or not str(text).strip():
+                continue
+            round_number = int(m.group(1) or m.group(2) or row.get('round') or row.get('subsession.round_number') or 0)
+            key = f"{participant}:{round_number}"
+            if key not in seen:
+                seen.add(key)
+                yield {'key': key, 'participant': participant, 'round': round_number, 'text': str(text)}
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load_checkpoint(path):
+    # Keys already written; a half-written last line (crash mid-write) is cut off
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as fp:
+        good_end = 0
+        for line in fp:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['key'])
+            except (ValueError, KeyError):
+                break
+            good_end += len(line)
+        fp.truncate(good_end)
+    return done
+
+
+def _init_worker(torch_threads):
+    # Each worker loads the model once, up front, and only uses its share of the cores
+    import torch
+    torch.set_num_threads(torch_threads)
+    scorer.get_english_words()
+    scorer.get_classifier()
+
+
+def score_items(items, threshold):
+    results = scorer.score_batch([item['text'] for item in items], threshold=threshold)
+    out = []
+    for item, (coherent, stage, analysis) in zip(items, results):
+        out.append(dict(
+            item,
+            coherent=coherent,
+            decided_by=stage,
+            responsibility_score=analysis.final_score,
+            real_word_ratio=round(analysis.real_word_ratio, 4),
+            matched_pos=sorted(analysis.matched_pos),
+            matched_neg=sorted(analysis.matched_neg),
+            matched_expl=sorted(analysis.matched_expl),
+            matched_evidence=sorted(analysis.matched_evidence),
+            scorer_version=scorer.SCORER_VERSION,
+        ))
+    return out
+
+
+def rescore(input_path, output_path, workers=None, batch_size=32, threshold=None):
+    done = load_checkpoint(output_path)
+    pending_items = (item for item in iter_items(read_rows(input_path)) if item['key'] not in done)
+    cpus = os.cpu_count() or 1
+    workers = workers or min(cpus, 2)
+    written = 0
+    with open(output_path, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                               initargs=(max(1, cpus // workers),)) as pool:
+        in_flight = set()
+        for batch in batched(pending_items, batch_size):
+            in_flight.add(pool.submit(score_items, batch, threshold))
+            # Bounded read-ahead keeps memory flat on large exports
+            if len(in_flight) >= 2 * workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                written += _write(out, finished)
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            written += _write(out, finished)
+    return len(done), written
+
+
+def _write(out, futures):
+    n = 0
+    for future in futures:
+        for result in future.result():
+            out.write(json.dumps(result) + '\n')
+            n += 1
+    out.flush()
+    return n
+
+
+def explain(text, threshold):
+    coherent = scorer.is_coherent(text, threshold=threshold, print_confidence=True)
+    a = scorer.responsibility_score(text)
+    print(f"Coherent: {coherent}")
+    print(f"Responsible phrases matched: {', '.join(sorted(a.matched_pos)) or 'None'}")
+    print(f"Avoidance phrases matched: {', '.join(sorted(a.matched_neg)) or 'None'}")
+    print(f"Explanation words/phrases matched: {', '.join(sorted(a.matched_expl)) or 'None'}")
+    print(f"Evidence/features matched: {', '.join(sorted(a.matched_evidence)) or 'None'}")
+    print(f"Real word ratio: {a.real_word_ratio:.2f}, Responsible phrase ratio: {a.pos_score:.2f}, "
+          f"Avoidance phrase ratio: {a.neg_score:.2f}, Explanation: {a.explanation_score:.2f}, "
+          f"Evidence: {a.evidence_score:.2f}")
+    print(f"Structured responsibility score (FINAL): {a.final_score}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score exported justifications")
+    parser.add_argument('input', nargs='?', help="oTree CSV export or JSONL file")
+    parser.add_argument('-o', '--output', help="JSONL results file (appended to, and used to resume)")
+    parser.add_argument('--workers', type=int, help="worker processes, ~1.6 GB of RAM each (default: min(CPU count, 2))")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threshold', type=float,
+                        help="coherence threshold on the current mode's scale (default: the mode's own)")
+    parser.add_argument('--text', action='append', help="score this text and print the details")
+    args = parser.parse_args(argv)
+
+    if args.text:
+        for text in args.text:
+            explain(text, args.threshold)
+        return 0
+    if not args.input or not args.output:
+        parser.error("input and --output are required unless --text is given")
+    skipped, written = rescore(args.input, args.output, args.workers, args.batch_size, args.threshold)
+    print(f"Scored {written} justifications ({skipped} already done) -> {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
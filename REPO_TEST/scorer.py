@@ -1,18 +1,309 @@
 # scorer.py
 
-from transformers import pipeline
+import json
+import logging
+import os
 import re
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import words as nltk_words
-import nltk
+import sys
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import NamedTuple
+
+from . import admission
+from .batching import MicroBatcher
+from .instrumentation import timed
+from .lexicon import LexiconMatcher, tokenize
+from .vocab import Vocabulary
 
 # One-time downloads (uncomment and run ONCE, then comment out again):
+# import nltk
 # nltk.download('words')
 # nltk.download('wordnet')
 
-classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
-ENGLISH_WORDS = set(nltk_words.words())
-lemmatizer = WordNetLemmatizer()
+logger = logging.getLogger(__name__)
+
+# How the zero-shot classifier (and the NLTK word list) get loaded:
+#   "lazy"  - on the first is_coherent() call (default)
+#   "eager" - in a background thread as soon as a web server process imports
+#             this module, followed by a warm-up inference so the first
+#             participant doesn't pay the cold start
+# Other otree commands (resetdb, test, exports, ...) never import torch.
+LOAD_POLICY = os.environ.get('SCORER_LOAD_POLICY', 'lazy').strip().lower()
+# "inprocess" loads the model in this process (fine for devserver);
+# "service" sends every call to the daemon in scoring_service.py (bin/web
+# starts it in the web dyno)
+MODE = os.environ.get('SCORER_MODE', 'inprocess').strip().lower()
+# Optional path; written (as JSON status) once the scorer is ready to serve
+READY_FILE = os.environ.get('SCORER_READY_FILE', '')
+# Compiled word list from `python -m REPO_TEST.vocab build`; memory-mapped and
+# shared by all workers. Falls back to the NLTK corpus when it's missing.
+VOCAB_PATH = os.environ.get('SCORER_VOCAB_PATH',
+                            os.path.join(os.path.dirname(__file__), 'data', 'english_words.vocab'))
+# Weights come from the pinned local snapshot (SCORER_MODEL_PATH, or the one
+# `python -m REPO_TEST.model_snapshot download` fetched; bin/post_compile does
+# that on deploy), loaded offline. Without one, MODEL_NAME is loaded from the
+# hub at the locked revision (or SCORER_MODEL_REVISION, else main).
+MODEL_NAME = "facebook/bart-large-mnli"
+# CPU inference backend for the coherence model:
+#   "fp32" - full precision (the reference)
+#   "int8" - dynamic int8 quantization of the Linear layers
+#   "bf16" - bfloat16 weights and activations
+# Run parity.py to compare a backend against fp32 before switching.
+BACKEND = os.environ.get('SCORER_BACKEND', 'fp32').strip().lower()
+BACKENDS = ('fp32', 'int8', 'bf16')
+WEB_COMMANDS = {'devserver_inner', 'prodserver', 'prodserver1of2'}
+# Concurrent is_coherent calls are gathered for up to BATCH_WAIT_MS and run
+# through the model as one padded batch of at most BATCH_SIZE texts
+BATCH_SIZE = int(os.environ.get('SCORER_BATCH_SIZE', '16'))
+BATCH_WAIT_MS = float(os.environ.get('SCORER_BATCH_WAIT_MS', '10'))
+# Page-side coherence checks (check_coherence) run on a dedicated executor and
+# wait at most VALIDATION_BUDGET seconds for the model, plus up to
+# ADMISSION_QUEUE_TIMEOUT for a slot. When the model misses
+# the budget (or fails), the fallback decides: the justification passes if at
+# least FALLBACK_MIN_REAL_RATIO of its words are real English words.
+# Every model call from here goes through admission.py first (concurrency cap,
+# queue timeout, per-participant retry budget).
+VALIDATION_BUDGET = float(os.environ.get('SCORER_VALIDATION_BUDGET', '3.0'))
+# One thread per admitted text, so a full batch can reach the micro-batcher
+VALIDATION_WORKERS = int(os.environ.get('SCORER_VALIDATION_WORKERS', str(admission.MAX_CONCURRENT)))
+FALLBACK_MIN_REAL_RATIO = float(os.environ.get('SCORER_FALLBACK_MIN_REAL_RATIO', '0.8'))
+# Live pre-scoring skips drafts while this many model calls are in flight
+PRESCORE_MAX_PENDING = int(os.environ.get('SCORER_PRESCORE_MAX_PENDING', str(VALIDATION_WORKERS)))
+# Results are memoized per (scorer version, normalized text[, mode, threshold]).
+# Bump SCORER_VERSION whenever the model, lexicons or scoring rules change so
+# stale entries can't be served.
+SCORER_VERSION = '2'
+CACHE_SIZE = int(os.environ.get('SCORER_CACHE_SIZE', '4096'))
+# Cheap stages of the is_coherent cascade; the model only sees what they can't reject
+MIN_WORDS = int(os.environ.get('SCORER_MIN_WORDS', '2'))
+MIN_REAL_RATIO = 0.6
+COHERENCE_LABELS = ["meaningful", "nonsense"]
+HYPOTHESIS_TEMPLATE = "This example is {}."
+# How the model scores coherence:
+#   "zero_shot"  - one pass per label in COHERENCE_LABELS, softmax across the
+#                  labels' entailment logits (the original behaviour; judged
+#                  against ZERO_SHOT_THRESHOLD)
+#   "entailment" - a single pass against ENTAILMENT_HYPOTHESIS, softmax over its
+#                  contradiction/entailment logits; half the compute. It has its
+#                  own scale, so it is judged against ENTAILMENT_THRESHOLD
+#                  (calibrate with: python -m REPO_TEST.parity --mode entailment)
+# Those defaults apply when callers pass threshold=None; an explicit threshold
+# overrides them and must be on the current mode's scale.
+COHERENCE_MODE = os.environ.get('SCORER_COHERENCE_MODE', 'zero_shot').strip().lower()
+COHERENCE_MODES = ('zero_shot', 'entailment')
+ENTAILMENT_HYPOTHESIS = "This example is meaningful."
+ENTAILMENT_THRESHOLD = float(os.environ.get('SCORER_ENTAILMENT_THRESHOLD', '0.8'))
+ZERO_SHOT_THRESHOLD = 0.9
+WARMUP_TEXT = "I kept my answer because the explanation supports it."
+
+_classifier = None
+_english_words = None
+_load_lock = threading.Lock()
+_status = {
+    'mode': 'inprocess',
+    'policy': LOAD_POLICY,
+    'backend': BACKEND,
+    'coherence_mode': COHERENCE_MODE,
+    'model': None,
+    'vocab': None,  # which word list fraction_real_words uses, once loaded
+    'state': 'not_loaded',  # not_loaded -> loading -> ready | failed
+    'load_seconds': None,
+    'error': None,
+}
+
+
+class LRUCache:
+    _MISSING = object()
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is self._MISSING:
+                self.misses += 1
+                return self._MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        return {'size': len(self._data), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+_coherence_cache = LRUCache(CACHE_SIZE)
+_analysis_cache = LRUCache(CACHE_SIZE)
+
+
+def normalize_text(response):
+    # Resubmits that only differ in whitespace or unicode form share a cache entry
+    return ' '.join(unicodedata.normalize('NFKC', response).split())
+
+
+def get_classifier():
+    global _classifier
+    if _classifier is None:
+        with _load_lock:
+            if _classifier is None:
+                _status['state'] = 'loading'
+                start = time.perf_counter()
+                try:
+                    clf = build_classifier()
+                except Exception as e:
+                    _status['state'] = 'failed'
+                    _status['error'] = repr(e)
+                    raise
+                _classifier = clf
+                _status['load_seconds'] = round(time.perf_counter() - start, 2)
+                if LOAD_POLICY != 'eager':
+                    _mark_ready()
+    return _classifier
+
+
+def build_classifier(backend=None):
+    backend = backend or BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"SCORER_BACKEND must be one of {BACKENDS}, not {backend!r}")
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+    from .model_snapshot import model_revision, snapshot_path
+    kwargs = {'torch_dtype': torch.bfloat16} if backend == 'bf16' else {}
+    path = snapshot_path()
+    if path:
+        # safetensors load without unpickling and low_cpu_mem_usage skips the
+        # random init, so a cold start is mostly one read of the weights. Each
+        # process still ends up with its own copy of the tensors.
+        model = AutoModelForSequenceClassification.from_pretrained(
+            path, local_files_only=True, use_safetensors=True, low_cpu_mem_usage=True, **kwargs)
+        tokenizer = AutoTokenizer.from_pretrained(path, local_files_only=True)
+        clf = pipeline("zero-shot-classification", model=model, tokenizer=tokenizer, device=-1)
+        _status['model'] = path
+    else:
+        revision = model_revision()
+        if revision == 'main':
+            logger.warning("No local model snapshot and no pinned revision, loading %s@main from the hub "
+                           "(run `python -m REPO_TEST.model_snapshot download`)", MODEL_NAME)
+        else:
+            logger.warning("No local model snapshot, loading %s@%s from the hub", MODEL_NAME, revision)
+        clf = pipeline("zero-shot-classification", model=MODEL_NAME, revision=revision, device=-1, **kwargs)
+        _status['model'] = f"{MODEL_NAME}@{revision}"
+    if backend == 'int8':
+        clf.model = torch.ao.quantization.quantize_dynamic(clf.model, {torch.nn.Linear}, dtype=torch.qint8)
+    clf.model.eval()
+    return clf
+
+
+def get_english_words():
+    global _english_words
+    if _english_words is None:
+        with _load_lock:
+            if _english_words is None:
+                if os.path.exists(VOCAB_PATH):
+                    _english_words = Vocabulary(VOCAB_PATH)
+                    _status['vocab'] = f"{os.path.basename(VOCAB_PATH)} ({len(_english_words)} words)"
+                else:
+                    # Scores differ from the compiled list (no inflections), so make it loud
+                    logger.error("%s not found, loading the NLTK word list instead "
+                                 "(run `python -m REPO_TEST.vocab build` and commit the file)", VOCAB_PATH)
+                    from nltk.corpus import words as nltk_words
+                    _english_words = set(nltk_words.words())
+                    _status['vocab'] = 'NLTK fallback'
+    return _english_words
+
+
+def _count_real(tokens):
+    english_words = get_english_words()
+    if isinstance(english_words, Vocabulary):
+        return english_words.count_known(tokens)
+    return sum(1 for t in tokens if t in english_words)
+
+
+def __getattr__(name):
+    # Old module attributes, now resolved on first access
+    if name == 'classifier':
+        return get_classifier()
+    if name == 'ENGLISH_WORDS':
+        return get_english_words()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _mark_ready():
+    _status['state'] = 'ready'
+    _status['error'] = None
+    if READY_FILE:
+        with open(READY_FILE, 'w') as fp:
+            json.dump(_status, fp)
+
+
+def is_ready():
+    return _status['state'] == 'ready'
+
+
+def local_status():
+    return dict(_status, batching=_batcher.stats(),
+                coherence_cache=_coherence_cache.stats(), analysis_cache=_analysis_cache.stats(),
+                stages=dict(STAGE_COUNTS), admission=admission.controller.stats())
+
+
+def status():
+    if MODE != 'service':
+        return local_status()
+    from . import scoring_service
+    try:
+        return dict(scoring_service.call('status'), mode='service')
+    except scoring_service.ServiceError as e:
+        return {'mode': 'service', 'policy': LOAD_POLICY, 'state': 'unreachable',
+                'load_seconds': None, 'error': str(e)}
+
+
+def warm_up():
+    get_english_words()
+    get_classifier()
+    _is_coherent_local(WARMUP_TEXT)
+    _mark_ready()
+
+
+def _eager_load():
+    try:
+        warm_up()
+        logger.info("Scorer ready (model loaded in %ss)", _status['load_seconds'])
+    except Exception as e:
+        _status['state'] = 'failed'
+        _status['error'] = repr(e)
+        logger.exception("Scorer warm-up failed")
+
+
+def start_background_load():
+    if READY_FILE and os.path.exists(READY_FILE):
+        os.remove(READY_FILE)
+    threading.Thread(target=_eager_load, name='scorer-warmup', daemon=True).start()
+
+
+def _is_web_process():
+    return len(sys.argv) > 1 and sys.argv[1] in WEB_COMMANDS
+
 
 RESPONSIBILITY_PHRASES = [
     "admit", "admitted", "admitting", "admits",
@@ -44,47 +335,221 @@ EVIDENCE_WORDS = {
     "verify", "verified", "validation", "justification"
 }
 
+# All lexicons compiled once; LEXICON.match() finds every category in one scan
+LEXICON = LexiconMatcher({
+    'pos': RESPONSIBILITY_PHRASES,
+    'neg': AVOIDANCE_PHRASES,
+    'expl': EXPLANATION_WORDS | EXPLANATION_PHRASES,
+    'evid': EVIDENCE_WORDS,
+})
+_adhoc_matchers = {}
+
+def _matcher_for(phrase_list):
+    key = tuple(phrase_list)
+    matcher = _adhoc_matchers.get(key)
+    if matcher is None:
+        matcher = _adhoc_matchers[key] = LexiconMatcher({'x': key})
+    return matcher
+
 def phrase_match_score(response, phrase_list):
-    resp_lower = response.lower()
-    matches = set(p for p in phrase_list if p in resp_lower)
+    matches = _matcher_for(phrase_list).match(response)['x']
     score = len(matches) / len(phrase_list) if phrase_list else 0
     return score, matches
 
 def explanation_match_score(response):
-    resp_lower = response.lower()
-    word_matches = set([word for word in EXPLANATION_WORDS if f" {word} " in f" {resp_lower} "])
-    phrase_matches = set([phrase for phrase in EXPLANATION_PHRASES if phrase in resp_lower])
-    all_matches = word_matches.union(phrase_matches)
+    all_matches = LEXICON.match(response)['expl']
     score = 1.0 if all_matches else 0.0  # FULL credit for just any explanation
     return score, all_matches
 
 def evidence_match_score(response):
-    resp_lower = response.lower()
-    matches = set([word for word in EVIDENCE_WORDS if word in resp_lower])
+    matches = LEXICON.match(response)['evid']
     score = 1.0 if matches else 0.0  # FULL credit if any evidence/feature used
     return score, matches
 
 def fraction_real_words(response):
-    tokens = re.findall(r'\w+', response.lower())
-    real = [t for t in tokens if t in ENGLISH_WORDS]
-    return len(real) / len(tokens) if tokens else 0.0
-
-def is_coherent(response, threshold=0.9, print_confidence=False):
-    labels = ["meaningful", "nonsense"]
-    result = classifier(response, labels)
-    scores = dict(zip(result['labels'], result['scores']))
-    coherence_score = scores.get("meaningful", 0)
-    f_real = fraction_real_words(response)
+    return analyze(response).real_word_ratio
+
+# Letters only: view and stream counts like 1000000 are honest justifications
+_REPEATED_CHAR = re.compile(r'([^\W\d_])\1{4,}')
+_VOWELS = set('aeiouy')
+
+def looks_like_gibberish(response, tokens):
+    # Keyboard mash that slips past the word list: long runs of one
+    # character, mostly vowel-less tokens, or the same few words repeated
+    if _REPEATED_CHAR.search(response):
+        return True
+    alpha = [t for t in tokens if t.isalpha()]
+    if alpha and sum(1 for t in alpha if not _VOWELS.intersection(t)) / len(alpha) > 0.5:
+        return True
+    return len(tokens) >= 5 and len(set(tokens)) / len(tokens) < 0.3
+
+_stage_lock = threading.Lock()
+STAGE_COUNTS = {'cache': 0, 'too_short': 0, 'real_words': 0, 'gibberish': 0, 'model': 0}
+
+def _resolved_by(stage):
+    with _stage_lock:
+        STAGE_COUNTS[stage] += 1
+
+def _label_id(model, prefix):
+    for label, idx in model.config.label2id.items():
+        if label.lower().startswith(prefix):
+            return idx
+    raise ValueError(f"model has no {prefix!r} label")
+
+def meaningful_scores(responses, classifier=None):
+    # Same maths as the zero-shot pipeline (softmax over each label's
+    # entailment logit), done as one padded forward pass over the batch.
+    # Logits are cast to fp32 so every backend is scored the same way.
+    import torch
+    clf = classifier or get_classifier()
+    premises = [r for r in responses for _ in COHERENCE_LABELS]
+    hypotheses = [HYPOTHESIS_TEMPLATE.format(label) for _ in responses for label in COHERENCE_LABELS]
+    inputs = clf.tokenizer(premises, hypotheses, padding=True, truncation='only_first', return_tensors='pt')
+    with torch.inference_mode():
+        logits = clf.model(**inputs).logits.float()
+    entail = logits[:, _label_id(clf.model, 'entail')].view(len(responses), len(COHERENCE_LABELS))
+    return entail.softmax(dim=1)[:, 0].tolist()
+
+def entailment_scores(responses, classifier=None):
+    # One pass per text: P(entailment) against P(contradiction) for a single hypothesis
+    import torch
+    clf = classifier or get_classifier()
+    inputs = clf.tokenizer(list(responses), [ENTAILMENT_HYPOTHESIS] * len(responses),
+                           padding=True, truncation='only_first', return_tensors='pt')
+    with torch.inference_mode():
+        logits = clf.model(**inputs).logits.float()
+    pair = logits[:, [_label_id(clf.model, 'contradict'), _label_id(clf.model, 'entail')]]
+    return pair.softmax(dim=1)[:, 1].tolist()
+
+def coherence_scores(responses, classifier=None, mode=None):
+    mode = mode or COHERENCE_MODE
+    if mode == 'entailment':
+        return entailment_scores(responses, classifier)
+    if mode == 'zero_shot':
+        return meaningful_scores(responses, classifier)
+    raise ValueError(f"SCORER_COHERENCE_MODE must be one of {COHERENCE_MODES}, not {mode!r}")
+
+def decision_threshold(threshold):
+    # An explicit threshold is always used as given (on the current mode's
+    # scale); None means the mode's default
+    if threshold is not None:
+        return threshold
+    return ENTAILMENT_THRESHOLD if COHERENCE_MODE == 'entailment' else ZERO_SHOT_THRESHOLD
+
+# Late-bound so a stand-in model (bench.py) can replace coherence_scores
+_batcher = MicroBatcher(lambda texts: coherence_scores(texts), max_batch_size=BATCH_SIZE,
+                        max_wait_ms=BATCH_WAIT_MS, name='scorer-batcher')
+
+def coherence_score(response):
+    if BATCH_SIZE <= 1:
+        return coherence_scores([response])[0]
+    return _batcher(response)
+
+def _verdict_key(response, threshold):
+    return (SCORER_VERSION, COHERENCE_MODE, normalize_text(response), decision_threshold(threshold))
+
+def _is_coherent_local(response, threshold=None, print_confidence=False):
+    response = normalize_text(response)
+    key = _verdict_key(response, threshold)
+    if not print_confidence:
+        cached = _coherence_cache.get(key)
+        if cached is not LRUCache._MISSING:
+            _resolved_by('cache')
+            return cached
+    coherent, stage = _coherence_cascade(response, threshold, print_confidence)
+    _resolved_by(stage)
+    _coherence_cache.put(key, coherent)
+    return coherent
+
+def cheap_rejection(analysis):
+    # Cheapest checks first; returns the stage that rejects the text, or None.
+    # They can only reject: a pass still needs the model.
+    if analysis.n_tokens < MIN_WORDS:
+        return 'too_short'
+    if analysis.real_word_ratio <= MIN_REAL_RATIO:
+        return 'real_words'
+    if looks_like_gibberish(analysis.text.lower(), analysis.tokens):
+        return 'gibberish'
+    return None
+
+def _coherence_cascade(response, threshold, print_confidence=False):
+    analysis = analyze(response)
+    stage = cheap_rejection(analysis)
+    if stage:
+        return False, stage
+    with timed('scorer', 'model', None):
+        confidence = coherence_score(analysis.text)
     if print_confidence:
-        print(f"(Coherence confidence: {coherence_score:.2f}, Real word ratio: {f_real:.2f})")
-    return coherence_score >= threshold and f_real > 0.6
+        print(f"(Coherence confidence: {confidence:.2f}, Real word ratio: {analysis.real_word_ratio:.2f})")
+    return confidence >= decision_threshold(threshold), 'model'
 
-def responsibility_score(response):
-    real_word_ratio = fraction_real_words(response)
-    pos_phrase_score, matched_pos = phrase_match_score(response, RESPONSIBILITY_PHRASES)
-    neg_phrase_score, matched_neg = phrase_match_score(response, AVOIDANCE_PHRASES)
-    explanation_score, matched_expl = explanation_match_score(response)
-    evidence_score, matched_evidence = evidence_match_score(response)
+def score_batch(responses, threshold=None):
+    # Bulk, always in-process: cheap stages per text, then a single model call
+    # for whatever is left. Returns (coherent, stage, analysis) per response.
+    analyses = [analyze(r) for r in responses]
+    results = [(False, cheap_rejection(a), a) for a in analyses]
+    pending = [i for i, (_, stage, _) in enumerate(results) if stage is None]
+    if pending:
+        scores = coherence_scores([analyses[i].text for i in pending])
+        for i, score in zip(pending, scores):
+            results[i] = (score >= decision_threshold(threshold), 'model', analyses[i])
+    return results
+
+
+class Analysis:
+    # Everything derived from one justification: normalized text, tokens,
+    # counts, lexicon matches and the responsibility features. Built once
+    # per distinct text by analyze() and shared by is_coherent and
+    # responsibility_score; treat it as read-only.
+    __slots__ = (
+        'text', 'tokens', 'n_tokens', 'n_real', 'real_word_ratio',
+        'matched_pos', 'matched_neg', 'matched_expl', 'matched_evidence',
+        'pos_score', 'neg_score', 'explanation_score', 'evidence_score', 'final_score',
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields[name])
+
+    def to_dict(self):
+        return {name: sorted(v) if isinstance(v, frozenset) else v
+                for name, v in ((n, getattr(self, n)) for n in self.__slots__)}
+
+    @classmethod
+    def from_dict(cls, data):
+        fields = dict(data)
+        for name in ('matched_pos', 'matched_neg', 'matched_expl', 'matched_evidence'):
+            fields[name] = frozenset(fields[name])
+        fields['tokens'] = tuple(fields['tokens'])
+        return cls(**fields)
+
+    def __repr__(self):
+        return f"<Analysis score={self.final_score} real={self.real_word_ratio:.2f} tokens={self.n_tokens}>"
+
+
+def analyze(response):
+    text = normalize_text(response)
+    key = (SCORER_VERSION, text)
+    analysis = _analysis_cache.get(key)
+    if analysis is LRUCache._MISSING:
+        with timed('scorer', 'analyze', None):
+            analysis = _analyze(text)
+        _analysis_cache.put(key, analysis)
+    return analysis
+
+def _analyze(text):
+    # The single normalize/tokenize pass; every feature works off these tokens
+    lower = text.lower()
+    tokens, spans = tokenize(lower)
+    n_real = _count_real(tokens)
+    real_word_ratio = n_real / len(tokens) if tokens else 0.0
+    matches = LEXICON.match_tokens(lower, tokens, spans)
+    matched_pos, matched_neg = matches['pos'], matches['neg']
+    matched_expl, matched_evidence = matches['expl'], matches['evid']
+    pos_phrase_score = len(matched_pos) / len(RESPONSIBILITY_PHRASES)
+    neg_phrase_score = len(matched_neg) / len(AVOIDANCE_PHRASES)
+    explanation_score = 1.0 if matched_expl else 0.0  # FULL credit for just any explanation
+    evidence_score = 1.0 if matched_evidence else 0.0  # FULL credit if any evidence/feature used
 
     # Compute main score: credit for explanation, evidence, and positive phrases;
     # penalize for avoidance
@@ -95,46 +560,179 @@ def responsibility_score(response):
         avoidance_penalty = 1 - neg_phrase_score
         final_score = (real_word_ratio + composite_justification * avoidance_penalty) / 2
     final_score = min(1.0, round(final_score, 3))
-    return final_score, matched_pos, matched_neg, matched_expl, matched_evidence, real_word_ratio, pos_phrase_score, neg_phrase_score, explanation_score, evidence_score
+    return Analysis(
+        text=text, tokens=tuple(tokens), n_tokens=len(tokens), n_real=n_real,
+        real_word_ratio=real_word_ratio,
+        matched_pos=frozenset(matched_pos), matched_neg=frozenset(matched_neg),
+        matched_expl=frozenset(matched_expl), matched_evidence=frozenset(matched_evidence),
+        pos_score=pos_phrase_score, neg_score=neg_phrase_score,
+        explanation_score=explanation_score, evidence_score=evidence_score,
+        final_score=final_score,
+    )
+
+def is_coherent(response, threshold=None, print_confidence=False):
+    if MODE == 'service':
+        from . import scoring_service
+        with timed('scorer', 'service_is_coherent', None):
+            return scoring_service.is_coherent(response, threshold=threshold)
+    return _is_coherent_local(response, threshold=threshold, print_confidence=print_confidence)
+
+def responsibility_score(response):
+    # Returns the justification's Analysis; .final_score is the score
+    if MODE == 'service':
+        from . import scoring_service
+        with timed('scorer', 'service_responsibility_score', None):
+            return scoring_service.responsibility_score(response)
+    return analyze(response)
+
+class CoherenceVerdict(NamedTuple):
+    coherent: bool
+    decided_by: str  # "model", "cache" (an earlier model answer), "cheap" or "fallback"
+    reason: str      # the cheap stage or why the fallback decided ("" otherwise)
+    seconds: float
+
+_validation_executor = ThreadPoolExecutor(max_workers=VALIDATION_WORKERS,
+                                          thread_name_prefix='scorer-validation')
+
+_inflight_lock = threading.Lock()
+_inflight = {}  # verdict key -> future of the model call computing it
+
+def cached_verdict(response, threshold=None):
+    # The cached is_coherent answer, or None if not computed yet
+    cached = _coherence_cache.get(_verdict_key(response, threshold))
+    return None if cached is LRUCache._MISSING else cached
+
+def _prescreen_local(response, threshold=None, record=False):
+    analysis = analyze(response)
+    rejected = cheap_rejection(analysis)
+    verdict = False if rejected else cached_verdict(response, threshold)
+    if record and verdict is not None:
+        _resolved_by(rejected or 'cache')
+    return rejected, verdict, analysis
+
+def prescreen(response, threshold=None, record=False):
+    # Everything short of the model: (stage that rejects the text or None,
+    # cached verdict or None, Analysis). In service mode the daemon answers,
+    # since it owns the word list and the verdict cache. record counts a
+    # decided text in STAGE_COUNTS.
+    if MODE == 'service':
+        from . import scoring_service
+        with timed('scorer', 'service_prescreen', None):
+            return scoring_service.prescreen(response, threshold=threshold, record=record)
+    return _prescreen_local(response, threshold, record)
+
+def _model_verdict(response, threshold, budget_key=None, background=False):
+    # None when a background call wasn't admitted by the scoring service
+    if MODE == 'service':
+        from . import scoring_service
+        with timed('scorer', 'service_is_coherent', None):
+            return scoring_service.is_coherent(response, threshold=threshold, budget_key=budget_key,
+                                               background=background)
+    return _is_coherent_local(response, threshold=threshold)
+
+def _inference_done(key, future, admitted):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+    if admitted:
+        admission.controller.release()
+
+def _submit(key, response, threshold, budget_key=None, background=False):
+    # Starts the model on the validation executor, behind admission. In
+    # service mode the daemon admits (one cap for every web process on the
+    # machine); in-process, this process does and holds the slot until the
+    # model is done. Background calls only take a free slot, else return None.
+    admitted = MODE != 'service'
+    if admitted:
+        if background:
+            if not admission.controller.try_acquire():
+                return None
+        else:
+            admission.controller.acquire(budget_key)
+    try:
+        future = _validation_executor.submit(_model_verdict, response, threshold, budget_key, background)
+    except Exception:
+        if admitted:
+            admission.controller.release()
+        raise
+    with _inflight_lock:
+        _inflight[key] = future
+    future.add_done_callback(lambda f, key=key: _inference_done(key, f, admitted))
+    return future
+
+def check_coherence(response, threshold=None, budget=None, budget_key=None):
+    # Like is_coherent, but never blocks the caller for more than the budget
+    # (plus admission's queue timeout). A late model answer is simply dropped.
+    # Cached verdicts, cheap rejections and texts already being scored skip
+    # admission; anything else needs a slot, and a model rejection spends
+    # budget_key's ("<participant>:<round>") retry budget. Raises
+    # admission.Rejected when there's no slot or the key is cooling down.
+    budget = VALIDATION_BUDGET if budget is None else budget
+    with timed('scorer', 'check_coherence', None):
+        start = time.perf_counter()
+        try:
+            rejected, verdict, analysis = prescreen(response, threshold, record=True)
+        except Exception as e:
+            logger.warning("Coherence prescreen failed, using fallback: %r", e)
+            coherent = fraction_real_words(response) >= FALLBACK_MIN_REAL_RATIO
+            return CoherenceVerdict(coherent, 'fallback', 'error', round(time.perf_counter() - start, 3))
+        if verdict is not None:
+            return CoherenceVerdict(verdict, 'cheap' if rejected else 'cache', rejected or '',
+                                    round(time.perf_counter() - start, 3))
+        key = _verdict_key(response, threshold)
+        with _inflight_lock:
+            future = _inflight.get(key)
+        if future is None:
+            future = _submit(key, response, threshold, budget_key)
+        # Waiting for admission (here or in the daemon) is on top of the model's
+        # budget in both modes: the caller waits at most budget + QUEUE_TIMEOUT
+        deadline = start + budget + admission.QUEUE_TIMEOUT
+        try:
+            coherent = future.result(timeout=max(0, deadline - time.perf_counter()))
+            if coherent is None:
+                # Joined a draft pre-score the service turned away; ask for real
+                future = _submit(key, response, threshold, budget_key)
+                coherent = future.result(timeout=max(0, deadline - time.perf_counter()))
+            if not coherent and MODE != 'service':
+                # Only model rejections spend the retry budget (the daemon does this in service mode)
+                admission.controller.charge(budget_key)
+            return CoherenceVerdict(coherent, 'model', '', round(time.perf_counter() - start, 3))
+        except admission.Rejected:
+            raise
+        except TimeoutError:
+            reason = 'timeout'
+        except Exception as e:
+            logger.warning("Coherence model failed, using fallback: %r", e)
+            reason = 'error'
+        coherent = analysis.real_word_ratio >= FALLBACK_MIN_REAL_RATIO
+        return CoherenceVerdict(coherent, 'fallback', reason, round(time.perf_counter() - start, 3))
+
+def prescore(response, threshold=None):
+    # Called with drafts while the participant types: returns the cheap checks
+    # at once and, if they pass, starts is_coherent in the background so the
+    # verdict is cached (here or in the scoring service) by submit time.
+    # Only runs when an admission slot is free right now; submits come first.
+    # 'pending' is False for a draft that was skipped, so the caller can ask
+    # again; 'analysis' is None if even the cheap checks couldn't run.
+    with timed('scorer', 'prescore', None):
+        try:
+            rejected, verdict, analysis = prescreen(response, threshold)
+        except Exception as e:
+            logger.warning("Draft prescreen failed: %r", e)
+            return {'verdict': None, 'pending': False, 'rejected_by': None, 'analysis': None}
+        pending = False
+        if verdict is None:
+            key = _verdict_key(response, threshold)
+            with _inflight_lock:
+                pending = key in _inflight
+                start = not pending and len(_inflight) < PRESCORE_MAX_PENDING
+            if start and _submit(key, response, threshold, background=True) is not None:
+                pending = True
+        return {'verdict': verdict, 'pending': pending, 'rejected_by': rejected, 'analysis': analysis}
 
-# Store scores
-participant_scores = {}
+if MODE == 'inprocess' and LOAD_POLICY == 'eager' and _is_web_process():
+    start_background_load()
 
 if __name__ == '__main__':
-    #participant_id = input("Enter participant ID: ")
-    max_attempts = 2
-    attempt = 0
-    coherent = False
-    response = ""
-    while attempt < max_attempts and not coherent:
-        response = input("Type your answer: ")
-        coherent = is_coherent(response, print_confidence=True)
-        if not coherent and attempt < max_attempts - 1:
-            print("Your answer does not appear to be a meaningful sentence. Please try again.\n")
-        attempt += 1
-    if not coherent:
-        print("Your answer may not be meaningful, but proceeding anyway.")
-
-    score, matched_pos, matched_neg, matched_expl, matched_evidence, real_ratio, pos_score, neg_score, expl_score, ev_score = responsibility_score(response)
-    print(f"\nResponsible phrases matched: {', '.join(sorted(matched_pos)) if matched_pos else 'None'}")
-    print(f"Avoidance phrases matched: {', '.join(sorted(matched_neg)) if matched_neg else 'None'}")
-    print(f"Explanation words/phrases matched: {', '.join(sorted(matched_expl)) if matched_expl else 'None'}")
-    print(f"Evidence/features matched: {', '.join(sorted(matched_evidence)) if matched_evidence else 'None'}")
-    print(f"Real word ratio: {real_ratio:.2f}, Responsible phrase ratio: {pos_score:.2f}, Avoidance phrase ratio: {neg_score:.2f}, Explanation: {expl_score:.2f}, Evidence: {ev_score:.2f}")
-    print(f"Structured responsibility score (FINAL): {score}")
-
-    participant_scores[participant_id] = {
-        "response": response,
-        "responsibility_score": score,
-        "matched_responsibility_phrases": list(matched_pos),
-        "matched_avoidance_phrases": list(matched_neg),
-        "matched_explanation_words_phrases": list(matched_expl),
-        "matched_evidence_words": list(matched_evidence),
-        "real_word_ratio": real_ratio,
-        "responsibility_phrase_ratio": pos_score,
-        "avoidance_phrase_ratio": neg_score,
-        "explanation_ratio": expl_score,
-        "evidence_ratio": ev_score
-    }
-    with open("participant_scores.json", "w") as fp:
-        json.dump(participant_scores, fp, indent=2)
\ No newline at end of file
+    from .rescore import main
+    sys.exit(main())
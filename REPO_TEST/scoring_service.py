@@ -0,0 +1,199 @@
+# scoring_service.py
+#
+# Local scoring daemon. It owns the zero-shot classifier, the English word
+# list and the lexicon scorer, so any number of web processes can score
+# justifications while only one copy of BART sits in memory.
+#
+#   SCORER_SERVICE_ADDRESS=unix:/tmp/repo_test_scorer.sock python -m REPO_TEST.scoring_service
+#
+# The web processes then run with SCORER_MODE=service and the same
+# SCORER_SERVICE_ADDRESS (either "unix:<path>" or "<host>:<port>", default
+# 127.0.0.1:8765). Without SCORER_MODE=service everything runs in-process,
+# which is what you want for devserver.
+#
+# On Heroku, set SCORER_MODE=service in the config vars and the web dyno's
+# entry point (bin/web, see Procfile) starts this daemon next to oTree on
+# unix:/tmp/repo_test_scorer.sock. Each web dyno then runs its own daemon,
+# so size the dyno for one model copy plus oTree. The worker dyno never
+# scores. Other settings (SCORER_BACKEND, SCORER_BATCH_SIZE, ADMISSION_*)
+# are read by the daemon from the same config vars.
+#
+# Protocol: one JSON object per line each way.
+#   -> {"op": "is_coherent", "text": "...", "threshold": null}   (null: the mode's default)
+#   <- {"ok": true, "result": true}
+# is_coherent also takes "budget_key" (for the retry budget) and
+# "background"; it goes through admission.py here, and a rejection comes back
+# as {"ok": false, "rejected": {"reason": ..., "retry_after": ...}}.
+# Other ops: "prescreen" (cheap checks and cached verdict, no model),
+# "responsibility_score" and "status".
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from . import admission, scorer
+
+logger = logging.getLogger(__name__)
+
+ADDRESS = os.environ.get('SCORER_SERVICE_ADDRESS', '127.0.0.1:8765')
+# Seconds a client waits for an answer (covers a cold model load on the daemon)
+TIMEOUT = float(os.environ.get('SCORER_SERVICE_TIMEOUT', '120'))
+
+
+class ServiceError(RuntimeError):
+    pass
+
+
+def parse_address(address):
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+    host, _, port = address.rpartition(':')
+    return socket.AF_INET, (host or '127.0.0.1', int(port))
+
+
+# --- Server side ---
+
+def handle_request(request):
+    op = request.get('op')
+    if op == 'is_coherent':
+        # Admission lives here in service mode: one cap for every web process
+        if request.get('background'):
+            if not admission.controller.try_acquire():
+                return None
+        else:
+            admission.controller.acquire(request.get('budget_key'))
+        try:
+            coherent = scorer._is_coherent_local(request['text'], threshold=request.get('threshold'))
+        finally:
+            admission.controller.release()
+        if not coherent and not request.get('background'):
+            admission.controller.charge(request.get('budget_key'))
+        return coherent
+    if op == 'prescreen':
+        rejected, verdict, analysis = scorer._prescreen_local(request['text'], threshold=request.get('threshold'),
+                                                              record=request.get('record', False))
+        return {'rejected_by': rejected, 'verdict': verdict, 'analysis': analysis.to_dict()}
+    if op == 'responsibility_score':
+        return scorer.analyze(request['text']).to_dict()
+    if op == 'status':
+        return scorer.local_status()
+    raise ValueError(f"unknown op {op!r}")
+
+
+class ScoringHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                reply = {'ok': True, 'result': handle_request(json.loads(line))}
+            except admission.Rejected as e:
+                reply = {'ok': False, 'error': str(e),
+                         'rejected': {'reason': e.reason, 'retry_after': e.retry_after}}
+            except Exception as e:
+                logger.exception("Scoring request failed")
+                reply = {'ok': False, 'error': repr(e)}
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+
+
+class TCPScoringServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixScoringServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(address=ADDRESS):
+    family, addr = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(addr):
+            os.remove(addr)
+        server = UnixScoringServer(addr, ScoringHandler)
+    else:
+        server = TCPScoringServer(addr, ScoringHandler)
+    # Accept connections straight away; callers block until the model is up
+    scorer.start_background_load()
+    logger.info("Scoring service listening on %s", address)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if family == socket.AF_UNIX and os.path.exists(addr):
+            os.remove(addr)
+
+
+# --- Client side ---
+
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, 'conn', None)
+    if conn is None:
+        family, addr = parse_address(ADDRESS)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(TIMEOUT)
+        sock.connect(addr)
+        conn = _local.conn = (sock, sock.makefile('rb'))
+    return conn
+
+
+def _drop_connection():
+    conn = getattr(_local, 'conn', None)
+    _local.conn = None
+    if conn is not None:
+        conn[1].close()
+        conn[0].close()
+
+
+def call(op, **kwargs):
+    payload = json.dumps(dict(kwargs, op=op)).encode() + b'\n'
+    # One retry covers a daemon restart between two requests (reset, refused
+    # or EOF on a reused socket). A timeout is never retried: the daemon may
+    # still be working on it, and waiting again would double the wait.
+    for attempt in range(2):
+        try:
+            sock, rfile = _connection()
+            sock.sendall(payload)
+            line = rfile.readline()
+            if not line:
+                raise ConnectionError("scoring service closed the connection")
+            break
+        except ConnectionError as e:
+            _drop_connection()
+            if attempt:
+                raise ServiceError(f"scoring service at {ADDRESS} unavailable: {e}") from e
+        except OSError as e:
+            _drop_connection()
+            raise ServiceError(f"scoring service at {ADDRESS} unavailable: {e}") from e
+    reply = json.loads(line)
+    if not reply['ok']:
+        if 'rejected' in reply:
+            raise admission.Rejected(**reply['rejected'])
+        raise ServiceError(reply['error'])
+    return reply['result']
+
+
+def is_coherent(response, threshold=None, budget_key=None, background=False):
+    # None if a background call found no free slot; raises admission.Rejected
+    return call('is_coherent', text=response, threshold=threshold, budget_key=budget_key, background=background)
+
+
+def prescreen(response, threshold=None, record=False):
+    reply = call('prescreen', text=response, threshold=threshold, record=record)
+    return reply['rejected_by'], reply['verdict'], scorer.Analysis.from_dict(reply['analysis'])
+
+
+def responsibility_score(response):
+    return scorer.Analysis.from_dict(call('responsibility_score', text=response))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    serve()
@@ -0,0 +1,134 @@
+# stimuli.py
+#
+# Stimulus registry: the people and songs shown in the task rounds, with the
+# AI prediction, the correct answer and the explanation image for each.
+# data/stimuli.json (or STIMULI_PATH) is parsed and validated once, at
+# import, into read-only tuples; pages only look entries up.
+#
+# Each task lists its rounds and a bank of items. When the bank has more
+# items than rounds, or the order should vary, set the task's "assignment":
+#
+#   fixed     first len(rounds) items, in file order (default)
+#   rotate    Latin-square rotation by participant id (counterbalancing)
+#   shuffle   a random draw per participant
+#
+# The draw is made once per participant in creating_session and kept in
+# participant.vars['stimuli'] as item ids.
+
+import json
+import os
+import random
+import re
+from types import MappingProxyType
+from typing import NamedTuple
+
+PATH = os.environ.get('STIMULI_PATH', os.path.join(os.path.dirname(__file__), 'data', 'stimuli.json'))
+ASSIGNMENTS = ('fixed', 'rotate', 'shuffle')
+VARS_KEY = 'stimuli'
+
+
+class Stimulus(NamedTuple):
+    id: str
+    task: str
+    description: str
+    prediction: object
+    correct: object
+    explanation: str
+
+
+class Task(NamedTuple):
+    name: str
+    rounds: tuple
+    assignment: str
+    question: str
+    items: tuple
+    choices: tuple = ()
+    score_range: tuple = ()
+
+
+def _text(value):
+    # Collapse the whitespace the JSON may carry; HTML would anyway
+    return re.sub(r'\s+', ' ', str(value)).strip()
+
+
+def _validate_item(task, raw, where):
+    missing = {'id', 'description', 'prediction', 'correct', 'explanation'} - set(raw)
+    if missing:
+        raise ValueError(f"{where}: missing {', '.join(sorted(missing))}")
+    if task.choices:
+        for key in ('prediction', 'correct'):
+            if raw[key] not in task.choices:
+                raise ValueError(f"{where}: {key} {raw[key]!r} is not one of {list(task.choices)}")
+        prediction, correct = raw['prediction'], raw['correct']
+    else:
+        try:
+            prediction, correct = float(raw['prediction']), float(raw['correct'])
+        except (TypeError, ValueError):
+            raise ValueError(f"{where}: prediction and correct must be numbers")
+        low, high = task.score_range or (float('-inf'), float('inf'))
+        if not (low <= prediction <= high and low <= correct <= high):
+            raise ValueError(f"{where}: prediction/correct outside {list(task.score_range)}")
+    return Stimulus(id=str(raw['id']), task=task.name, description=_text(raw['description']),
+                    prediction=prediction, correct=correct, explanation=str(raw['explanation']))
+
+
+def load(path=PATH):
+    with open(path, encoding='utf-8') as fp:
+        data = json.load(fp)
+    tasks, items, seen_rounds = {}, {}, set()
+    for name, spec in data.items():
+        task = Task(name=name, rounds=tuple(spec['rounds']), assignment=spec.get('assignment', 'fixed'),
+                    question=_text(spec.get('question', '')), items=(),
+                    choices=tuple(spec.get('choices', ())), score_range=tuple(spec.get('score_range', ())))
+        if task.assignment not in ASSIGNMENTS:
+            raise ValueError(f"{path}: {name}.assignment must be one of {ASSIGNMENTS}")
+        if seen_rounds & set(task.rounds):
+            raise ValueError(f"{path}: {name} reuses rounds {sorted(seen_rounds & set(task.rounds))}")
+        seen_rounds |= set(task.rounds)
+        bank = tuple(_validate_item(task, raw, f"{path}: {name}.items[{i}]") for i, raw in enumerate(spec['items']))
+        if len(bank) < len(task.rounds):
+            raise ValueError(f"{path}: {name} has {len(bank)} items for {len(task.rounds)} rounds")
+        for stimulus in bank:
+            if stimulus.id in items:
+                raise ValueError(f"{path}: duplicate item id {stimulus.id!r}")
+            items[stimulus.id] = stimulus
+        tasks[name] = task._replace(items=bank)
+    return MappingProxyType(tasks), MappingProxyType(items)
+
+
+TASKS, ITEMS = load()
+TASK_BY_ROUND = MappingProxyType({r: task for task in TASKS.values() for r in task.rounds})
+
+
+def rounds(task_name):
+    return list(TASKS[task_name].rounds)
+
+
+def default_order(task):
+    return tuple(item.id for item in task.items[:len(task.rounds)])
+
+
+def assign(participant, id_in_session, rng=random):
+    # Called once per participant (round 1 of creating_session)
+    order = {}
+    for task in TASKS.values():
+        n = len(task.rounds)
+        if task.assignment == 'rotate':
+            offset = (id_in_session - 1) % len(task.items)
+            bank = task.items[offset:] + task.items[:offset]
+            order[task.name] = [item.id for item in bank[:n]]
+        elif task.assignment == 'shuffle':
+            order[task.name] = [item.id for item in rng.sample(task.items, n)]
+        else:
+            order[task.name] = list(default_order(task))
+    participant.vars[VARS_KEY] = order
+    return order
+
+
+def for_round(participant, round_number):
+    # The Stimulus this participant sees in round_number (None outside the task rounds)
+    task = TASK_BY_ROUND.get(round_number)
+    if task is None:
+        return None
+    order = participant.vars.get(VARS_KEY, {}).get(task.name) or default_order(task)
+    return ITEMS[order[task.rounds.index(round_number)]]
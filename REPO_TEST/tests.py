@@ -0,0 +1,106 @@
+from otree.api import Currency as c, currency_range, expect, Submission, SubmissionMustFail
+from . import ledger, pages
+from ._builtin import Bot
+from .models import C
+
+# Bots for every branch of page_sequence. With the REPO_TEST_bots session
+# config, treatments rotate through C.TREATMENTS, so 4+ participants cover
+# control / high-responsibility and both trust-survey orders.
+#
+#   otree test REPO_TEST_bots 8
+#   otree browser_bots REPO_TEST_bots 50       (against a running server)
+
+GOOD_JUSTIFICATION = (
+    "I kept my answer because the explanation shows which factors matter most, "
+    "and I take responsibility for my final decision."
+)
+# Song rounds are argued with view and stream counts; runs of digits are not keyboard mash
+NUMERIC_JUSTIFICATION = (
+    "I raised my score because the song has over 4300000 tiktok posts and 1000000 streams, "
+    "and I take responsibility for my final decision."
+)
+# Rejected by the cheap real-word check, so the model never decides these
+GIBBERISH = "qwxz vbnm plkj trzk"
+
+
+class PlayerBot(Bot):
+    cases = ['standard', 'resubmit', 'consent_refused', 'comprehension_fail']
+
+    def play_round(self):
+        r = self.round_number
+        high_resp = self.player.high_responsibility
+        # Every page after the comprehension check is a RequiresComprehensionPass
+        failed = self.case == 'comprehension_fail'
+
+        if r == 1:
+            yield pages.ProlificID, dict(prolific_id=f"BOT{self.participant.id_in_session:04d}")
+            yield pages.DataPrivacy, dict(data_privacy_consent=True)
+            answers = dict(consent=True, comp_task_understanding='6',
+                           comp_model_accuracy='86% & 72%', comp_payment='£2.00 + bonus')
+            if self.case == 'consent_refused':
+                yield SubmissionMustFail(pages.ConsentAndComprehension, dict(answers, consent=False))
+            if failed:
+                wrong = dict(answers, comp_task_understanding='2')
+                yield SubmissionMustFail(pages.ConsentAndComprehension, wrong)
+                # Second wrong attempt goes through and ends the study
+                yield pages.ConsentAndComprehension, wrong
+                expect(self.player.comprehension_failed, True)
+                # No Next button: participants return the study on Prolific
+                yield Submission(pages.ComprehensionFail, check_html=False)
+            else:
+                yield pages.ConsentAndComprehension, answers
+                yield pages.Demographics, dict(age=30, gender='Female', education_level='College',
+                                               ai_experience='A little')
+                if self.player.trust_early:
+                    yield pages.AITrustSurvey, dict(ai_trust_1=5, ai_trust_2=4, ai_trust_3=6)
+                yield pages.ResponsibilityIntroIncome if high_resp else pages.ControlIntroIncome
+
+        if failed:
+            # Nothing else is displayed, intros included, in any later round
+            expect(self.participant.vars.get('comprehension_failed'), True)
+            return
+
+        if r in C.INCOME_ROUNDS:
+            yield pages.Task_Info_Income, dict(income_choice='Middle income')
+            revise = dict(income_choice_rev='High income')
+            if high_resp:
+                if self.case == 'resubmit':
+                    yield SubmissionMustFail(pages.Task_Revise_Income, dict(revise, justification=''))
+                    yield SubmissionMustFail(pages.Task_Revise_Income, dict(revise, justification=GIBBERISH))
+                revise['justification'] = GOOD_JUSTIFICATION
+            yield pages.Task_Revise_Income, revise
+            yield pages.Task_Results_Income
+            if r == C.INCOME_ROUNDS[-1]:
+                if self.case == 'resubmit':
+                    yield SubmissionMustFail(pages.AttentionCheck, dict(response='rain'))
+                yield pages.AttentionCheck, dict(response='sunshine')
+
+        if r in C.SONGS_ROUNDS:
+            if r == C.SONGS_ROUNDS[0]:
+                yield pages.ResponsibilityIntroSongs if high_resp else pages.ControlIntroSongs
+            yield pages.Task_Info_Songs, dict(music_choice=70.5)
+            revise = dict(music_choice_rev=72.0)
+            if high_resp:
+                if self.case == 'resubmit':
+                    yield SubmissionMustFail(pages.Task_Revise_Songs, dict(revise, justification=GIBBERISH))
+                revise['justification'] = NUMERIC_JUSTIFICATION
+            yield pages.Task_Revise_Songs, revise
+            yield pages.Task_Results_Music
+
+        if r == C.NUM_ROUNDS:
+            if not self.player.trust_early:
+                yield pages.AITrustSurveyPost, dict(ai_trust_1=5, ai_trust_2=4, ai_trust_3=6)
+            # Debrief has no next button (participants leave via the Prolific link).
+            # Payment is settled when it renders, so the forced submit adds nothing.
+            yield Submission(pages.Debrief, check_html=False)
+            round1 = self.player.in_round(1)
+            expect(round1.total_bonus_payment, c(sum(ledger.totals(self.participant))))
+            expect(round1.final_payment, '>=', round1.total_bonus_payment)
+            expect(self.participant.payoff, round1.final_payment)
+
+
+def call_live_method(method, **kwargs):
+    # Drafts typed on the revise pages (Player.live_justification)
+    if kwargs['page_class'] in (pages.Task_Revise_Income, pages.Task_Revise_Songs):
+        for seq, draft in enumerate(['', GIBBERISH, GOOD_JUSTIFICATION], start=1):
+            method(1, {'seq': seq, 'draft': draft})
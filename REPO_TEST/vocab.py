@@ -0,0 +1,222 @@
+# vocab.py
+#
+# Precompiled English vocabulary for fraction_real_words().
+#
+#   python -m REPO_TEST.vocab build          # writes data/english_words.vocab
+#   python -m REPO_TEST.vocab check ignored depends
+#
+# The build step takes the lower-case NLTK `words` list and adds WordNet's
+# irregular forms of listed words ("ran", "stopped") plus the correctly
+# spelled regular inflections that WordNet lemmatizes back to a listed word
+# ("ignored" -> "ignore", "depends" -> "depend"). It deduplicates and sorts
+# the result and writes a read-only open-addressing hash table. Workers
+# memory-map the file instead of each building a ~236k-string set, so the
+# pages are shared through the OS page cache and startup is just an mmap.
+#
+# bin/post_compile builds it on every Heroku deploy (the NLTK corpora are
+# downloaded there too). Without the file the scorer falls back to the plain
+# NLTK set, which scores inflected words differently; the admin report flags
+# that ("Word list: NLTK fallback").
+#
+# File layout (little endian):
+#   b'RTVOCAB1' | uint32 n_words | uint32 n_slots
+#   n_slots x uint32  offset of the word in the blob, or EMPTY
+#   blob              per word: uint8 length + utf-8 bytes, in sorted order
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+
+MAGIC = b'RTVOCAB1'
+HEADER = struct.Struct('<8sII')
+SLOT = struct.Struct('<I')
+EMPTY = 0xFFFFFFFF
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'data', 'english_words.vocab')
+
+# (suffix, WordNet parts of speech that should lemmatize the inflected form back)
+INFLECTIONS = [
+    ('s', 'nv'), ('es', 'nv'), ('ies', 'nv'),
+    ('d', 'v'), ('ed', 'v'), ('ied', 'v'), ('ing', 'v'),
+    ('er', 'a'), ('est', 'a'),
+]
+EXCEPTION_FILES = ('noun.exc', 'verb.exc', 'adj.exc')
+_VOWELS = 'aeiou'
+
+
+def _consonant_y(word):
+    return len(word) > 1 and word[-1] == 'y' and word[-2] not in _VOWELS
+
+
+def _inflect(word, suffix, irregular, irregular_past):
+    # The regular spelling of word + suffix, or None where the rules give
+    # none. WordNet's lemmatizer strips suffixes without checking spelling
+    # ("stoped", "comeing" both lemmatize fine), so each form is spelled out
+    # here. Doubled consonants aren't predictable from spelling alone (stopped
+    # vs visited): when WordNet lists the doubled form as an exception, that
+    # form is the right one and the plain one is skipped. Verbs with an
+    # irregular past in WordNet (run -> ran, come -> came) get no -ed form.
+    if suffix in ('ies', 'ied'):
+        return word[:-1] + suffix if _consonant_y(word) else None
+    if suffix == 's':
+        return None if word.endswith(('s', 'x', 'z', 'ch', 'sh')) or _consonant_y(word) else word + 's'
+    if suffix == 'es':
+        return word + 'es' if word.endswith(('s', 'x', 'z', 'ch', 'sh', 'o')) else None
+    if suffix in ('d', 'ed') and word in irregular_past:
+        return None
+    if suffix == 'd':
+        return word + 'd' if word.endswith('e') else None
+    if word.endswith('e'):
+        if suffix == 'ing':
+            if word.endswith('ie'):
+                return word[:-2] + 'ying'  # die -> dying
+            return word + 'ing' if word.endswith(('ee', 'oe', 'ye')) else word[:-1] + 'ing'
+        return None if suffix == 'ed' else word + suffix[1:]  # larger, largest ("d" covers -ed)
+    if _consonant_y(word) and suffix != 'ing':
+        return None if suffix == 'ed' else word[:-1] + 'i' + suffix  # happier ("ied" covers -ed)
+    if word + word[-1] + suffix in irregular:
+        return None
+    return word + suffix
+
+
+def wordnet_exceptions():
+    # {file: {inflected form: lemmas}} from WordNet's irregular-form lists (ran, children, stopped, ...)
+    from nltk.corpus import wordnet
+    exceptions = {}
+    for name in EXCEPTION_FILES:
+        forms = exceptions[name] = {}
+        with wordnet.open(name) as fp:
+            for line in fp:
+                form, *lemmas = line.split()
+                forms.setdefault(form, set()).update(lemmas)
+    return exceptions
+
+
+def build_words():
+    from nltk.corpus import words as nltk_words
+    from nltk.stem import WordNetLemmatizer
+
+    # Only lower-case entries: tokens are lower-cased, so "English" never matched anyway
+    base = {w for w in nltk_words.words() if w.isalpha() and w == w.lower()}
+    exceptions = wordnet_exceptions()
+    irregular = {form: lemmas for forms in exceptions.values() for form, lemmas in forms.items()}
+    irregular_past = {lemma for form, lemmas in exceptions['verb.exc'].items()
+                      if not form.endswith(('ing', 's')) for lemma in lemmas}
+    # Irregular forms of listed words come straight from WordNet
+    extra = {form for form, lemmas in irregular.items() if form.isalpha() and lemmas & base} - base
+    lemmatizer = WordNetLemmatizer()
+    for word in base:
+        for suffix, parts in INFLECTIONS:
+            form = _inflect(word, suffix, irregular, irregular_past)
+            if form is None or form in base or form in extra:
+                continue
+            if any(lemmatizer.lemmatize(form, pos) == word for pos in parts):
+                extra.add(form)
+    return sorted(base | extra)
+
+
+def write_vocab(words, path=DEFAULT_PATH):
+    words = sorted(set(words))
+    n_slots = 1
+    while n_slots < 2 * len(words):
+        n_slots *= 2
+    slots = [EMPTY] * n_slots
+    blob = bytearray()
+    n_words = 0
+    for word in words:
+        encoded = word.encode('utf-8')
+        if len(encoded) > 255:
+            continue
+        n_words += 1
+        i = zlib.crc32(encoded) & (n_slots - 1)
+        while slots[i] != EMPTY:
+            i = (i + 1) & (n_slots - 1)
+        slots[i] = len(blob)
+        blob.append(len(encoded))
+        blob += encoded
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, n_words, n_slots))
+        fp.write(struct.pack(f'<{n_slots}I', *slots))
+        fp.write(blob)
+    os.replace(tmp, path)
+    return path
+
+
+class Vocabulary:
+    # Read-only set-like view over a built vocabulary file
+
+    def __init__(self, path=DEFAULT_PATH, memo_size=65536):
+        with open(path, 'rb') as fp:
+            self._mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._n_words, n_slots = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a vocabulary file")
+        self.path = path
+        self._mask = n_slots - 1
+        self._slots = memoryview(self._mm)[HEADER.size:HEADER.size + SLOT.size * n_slots].cast('I')
+        self._blob = HEADER.size + SLOT.size * n_slots
+        # Tokens already seen are answered from a small per-process memo
+        self._memo = {}
+        self._memo_size = memo_size
+
+    def __contains__(self, word):
+        found = self._memo.get(word)
+        if found is None:
+            if len(self._memo) >= self._memo_size:
+                self._memo.clear()
+            # Stored as 0/1 so count_known can sum them directly
+            found = self._memo[word] = int(self._probe(word))
+        return bool(found)
+
+    def count_known(self, tokens):
+        # Bulk form of `sum(t in vocab for t in tokens)`. Once every token has
+        # been seen this is a single C-level pass over the memo, a little
+        # faster than the old `t in set` generator.
+        try:
+            return sum(map(self._memo.__getitem__, tokens))
+        except KeyError:
+            return sum(token in self for token in tokens)
+
+    def __len__(self):
+        return self._n_words
+
+    def _probe(self, word):
+        encoded = word.encode('utf-8')
+        mm, slots = self._mm, self._slots
+        i = zlib.crc32(encoded) & self._mask
+        while True:
+            offset = slots[i]
+            if offset == EMPTY:
+                return False
+            start = self._blob + offset
+            if mm[start + 1:start + 1 + mm[start]] == encoded:
+                return True
+            i = (i + 1) & self._mask
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the compiled English vocabulary")
+    sub = parser.add_subparsers(dest='command', required=True)
+    build = sub.add_parser('build')
+    build.add_argument('--out', default=DEFAULT_PATH)
+    check = sub.add_parser('check')
+    check.add_argument('words', nargs='+')
+    check.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        words = build_words()
+        write_vocab(words, args.out)
+        print(f"Wrote {len(Vocabulary(args.out))} words to {args.out} ({os.path.getsize(args.out) // 1024} KiB)")
+    else:
+        vocab = Vocabulary(args.path)
+        for word in args.words:
+            print(f"{word}: {'yes' if word.lower() in vocab else 'no'}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,15 @@ SESSION_CONFIGS = [
          app_sequence=['REPO_TEST'],
          num_demo_participants=2,
      ),
+     # Bot load test: `otree test REPO_TEST_bots 8`, or browser bots against a
+     # running server (see REPO_TEST/loadtest.py)
+     dict(
+         name='REPO_TEST_bots',
+         app_sequence=['REPO_TEST'],
+         num_demo_participants=8,
+         use_browser_bots=True,
+         balanced_treatments=True,
+     ),
 ]
 
 # if you set a property in SESSION_CONFIG_DEFAULTS, it will be inherited by all configs